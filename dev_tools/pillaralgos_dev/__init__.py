@@ -6,5 +6,6 @@ graphing, sanity checks, and so on.
 HOW TO:
     from pillaralgos_dev import dev_helpers as dev
     from pillaralgos_dev import sanity_checks as sane
+    from pillaralgos_dev import benchmarks as bench
 '''
 __version__ = '0.1.3'
\ No newline at end of file
@@ -0,0 +1,407 @@
+"""
+Timing helpers to compare the speed of different implementations in `pillaralgos`.
+
+HOW TO:
+    from pillaralgos_dev import benchmarks as bench
+    data = json.load(open("data/sample_med.json"))
+    bench.ingest_speedup(data, repeat=3)
+    bench.ingest_memory("data/sample_med.json")
+    bench.algo1_speedup(data, min_=0.5)
+    bench.precision_speedup(1000000, precision=12, num_chatters=50000)
+
+    # time and memory of every entry point on synthetic chats, saved as json
+    bench.run_suite("bench_new.json", sizes=[10000, 100000], bursts=10)
+    bench.compare_suites("bench_old.json", "bench_new.json")
+
+    # or from the shell
+    python -m pillaralgos_dev.benchmarks bench_new.json --sizes 10000 100000 1000000
+"""
+import argparse
+import contextlib
+import datetime as dt
+import io
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pillaralgos
+from pillaralgos import algo1, algo2, algo3_0, algo3_5, brain
+from pillaralgos.helpers import data_handler as dh
+from pillaralgos.helpers import emoji_getter as eg
+from pillaralgos_dev import synthetic_chat as syn
+
+
+def best_time(fctn, repeat=3, **kwargs):
+    """
+    Runs `fctn(**kwargs)` `repeat` times, returns the fastest run in seconds
+    """
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fctn(**kwargs)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def ingest_speedup(data, repeat=3, keep_user_vars=False):
+    """
+    Times `organize_twitch_chat` with the row by row `dictExtractor` and with
+    the columnar `columnExtractor`
+
+    input
+    -----
+    data: list
+        List of dictionaries of data from Twitch chat
+    repeat: int
+        Number of times to run each version, fastest run is kept
+
+    output
+    ------
+    results: dict
+        Dictionary of number of messages, seconds per version, and the speedup
+    """
+    dict_sec = best_time(
+        dh.organize_twitch_chat,
+        repeat=repeat,
+        data=data,
+        keep_user_vars=keep_user_vars,
+        columnar=False,
+    )
+    col_sec = best_time(
+        dh.organize_twitch_chat,
+        repeat=repeat,
+        data=data,
+        keep_user_vars=keep_user_vars,
+        columnar=True,
+    )
+    results = {
+        "num_messages": len(data),
+        "dictExtractor_sec": dict_sec,
+        "columnExtractor_sec": col_sec,
+        "speedup": dict_sec / col_sec,
+    }
+    return results
+
+
+def peak_memory(fctn, **kwargs):
+    """
+    Runs `fctn(**kwargs)` once, returns the peak memory it allocated in MB
+    (measured with `tracemalloc`, so only python and numpy allocations count)
+    """
+    tracemalloc.start()
+    fctn(**kwargs)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def load_and_organize(filename):
+    """
+    The usual way to ingest a chat log, `json.load` then `organize_twitch_chat`
+    """
+    with open(filename) as f:
+        data = json.load(f)
+    return dh.organize_twitch_chat(data)
+
+
+def ingest_memory(filename, compare_load=True):
+    """
+    Peak memory of reading a chat json with `stream_twitch_chat` and, optionally,
+    with `json.load` + `organize_twitch_chat`
+
+    input
+    -----
+    filename: str
+        Path to a chat json, ex: sample_med.json or `synthetic_chat.write_chat` output
+    compare_load: bool
+        False to skip `json.load`, which might not fit in memory for very big files
+
+    output
+    ------
+    results: dict
+        Dictionary of file size, number of messages and peak MB per ingest path
+    """
+    results = {"file_mb": os.path.getsize(filename) / 2 ** 20}
+    tracemalloc.start()
+    df = dh.stream_twitch_chat(filename)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results["num_messages"] = len(df)
+    results["stream_peak_mb"] = peak / 2 ** 20
+    del df
+    if compare_load:
+        results["load_peak_mb"] = peak_memory(load_and_organize, filename=filename)
+    return results
+
+
+def loop_chunk_uniques(big_df, bounds, min_):
+    """
+    The old way algo1 found unique chatters, one `unique()` per chunk and per hour
+    and one `DataFrame.append` per hour. Kept here to time against `algo1.chunk_uniques`.
+    """
+    first_sec, hour_bounds, chunk_bounds = bounds
+    max_uniques = len(big_df["_id"].unique())
+    results = pd.DataFrame()
+    for i in range(len(hour_bounds)):
+        start, stop = hour_bounds[i]
+        total_uniques = len(big_df.iloc[start:stop]["_id"].unique())
+        hr_uniques = {"num_unique": [], "perc_rel_unique": [], "perc_abs_unique": []}
+        for hour, chunk, s, e in chunk_bounds:
+            if hour == i:
+                unique = len(big_df.iloc[s:e]["_id"].unique())
+                hr_uniques["num_unique"].append(unique)
+                hr_uniques["perc_rel_unique"].append(unique / total_uniques)
+                hr_uniques["perc_abs_unique"].append(unique / max_uniques)
+        hr_uniques = pd.DataFrame(hr_uniques)
+        hr_uniques["hour"] = i + 1
+        results = results.append(hr_uniques)
+    return results
+
+
+def algo1_speedup(data, min_=2, repeat=3):
+    """
+    Times algo1's per chunk loop (`loop_chunk_uniques`) and the grouped distinct
+    count (`algo1.chunk_uniques`) on the same chunks
+
+    input
+    -----
+    data: list
+        List of dictionaries of data from Twitch chat
+    min_: int
+        Approximate number of minutes each clip should be
+
+    output
+    ------
+    results: dict
+        Dictionary of number of chunks, seconds per version, and the speedup
+    """
+    chat = dh.chatFrame(data)
+    bounds = chat.get_bounds(min_)
+    kwargs = {"big_df": chat.big_df, "bounds": bounds, "min_": min_}
+    loop_sec = best_time(loop_chunk_uniques, repeat=repeat, **kwargs)
+    grouped_sec = best_time(algo1.chunk_uniques, repeat=repeat, **kwargs)
+    results = {
+        "num_chunks": len(bounds[2]),
+        "loop_sec": loop_sec,
+        "grouped_sec": grouped_sec,
+        "speedup": loop_sec / grouped_sec,
+    }
+    return results
+
+
+def precision_speedup(num_messages=1000000, min_=2, precision=12, repeat=3, **chat_kwargs):
+    """
+    Times and memory profiles algo1's unique chatters on one synthetic chat, exact
+    (`featureStore` + `algo1.chunk_uniques`) and estimated (`sketchStore` +
+    `algo1.chunk_uniques(precision=...)`), both built from scratch
+
+    input
+    -----
+    num_messages: int
+        Size of the synthetic chat
+    min_: int
+        Clip length
+    precision: int
+        HyperLogLog precision of the estimate
+    chat_kwargs:
+        Passed to `synthetic_chat.write_chat`, ex: num_chatters, hours
+
+    output
+    ------
+    results: dict
+        Dictionary of seconds and peak MB of each version, the speedup, and the
+        largest relative error of the estimated `num_unique`
+    """
+    with tempfile.TemporaryDirectory() as folder:
+        chat_file = os.path.join(folder, "synthetic.json")
+        syn.write_chat(chat_file, num_messages, **chat_kwargs)
+        chat = dh.chatFrame(chat_file)
+    big_df, bounds = chat.big_df, chat.get_bounds(min_)
+
+    def exact():
+        return algo1.chunk_uniques(big_df, bounds, min_, features=dh.featureStore(big_df))
+
+    def approx():
+        sketches = dh.sketchStore(big_df, precision=precision)
+        return algo1.chunk_uniques(big_df, bounds, min_, precision=precision, sketches=sketches)
+
+    exact_num, approx_num = exact()["num_unique"], approx()["num_unique"]
+    results = {
+        "num_messages": len(big_df),
+        "exact_sec": best_time(exact, repeat=repeat),
+        "approx_sec": best_time(approx, repeat=repeat),
+        "exact_peak_mb": peak_memory(exact),
+        "approx_peak_mb": peak_memory(approx),
+        "max_error": float((abs(approx_num - exact_num) / exact_num).max()),
+    }
+    results["speedup"] = results["exact_sec"] / results["approx_sec"]
+    return results
+
+
+def suite_cases(min_=2):
+    """
+    What `run_suite` measures, case:(input, fctn). Each fctn takes the chat `data` and the
+    organized `big_df`, input says which one it uses:
+        "list": the list of dictionaries from `json.load`
+        "file": the path of the chat json
+        "df": the organized df
+        "any": the list, or the path if the chat is too big to load
+    """
+    cases = {
+        "organize_twitch_chat": ("list", lambda data, big_df: dh.organize_twitch_chat(data)),
+        "stream_twitch_chat": ("file", lambda data, big_df: dh.stream_twitch_chat(data)),
+        "get_chunks": ("df", lambda data, big_df: dh.get_chunks(big_df, min_=min_)),
+        "algo1.run": ("any", lambda data, big_df: algo1.run(data, min_=min_)),
+        "algo2.run": ("any", lambda data, big_df: algo2.run(data, min_=min_)),
+        "algo3_0.run": ("any", lambda data, big_df: algo3_0.run(data, min_=min_)),
+        "algo3_5.run": ("any", lambda data, big_df: algo3_5.run(data, min_=min_)),
+        "brain.run": ("any", lambda data, big_df: brain.run(data, clip_length=min_)),
+        "emoticonExtractor.run": ("list", lambda data, big_df: quiet_emoticons(data)),
+    }
+    return cases
+
+
+def quiet_emoticons(data):
+    """
+    `emoticonExtractor(data).run()` without its print
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        return eg.emoticonExtractor(data).run()
+
+
+def run_suite(
+    filename,
+    sizes=[10000, 100000],
+    min_=2,
+    repeat=3,
+    memory=True,
+    load_max=1000000,
+    label=None,
+    **chat_kwargs,
+):
+    """
+    Times and memory profiles `organize_twitch_chat`, `stream_twitch_chat`, `get_chunks`,
+    every `algoX.run`, `brain.run` and `emoticonExtractor.run` on synthetic chats of each
+    size, and saves the results as json to compare versions with `compare_suites`
+
+    input
+    -----
+    filename: str
+        Where to save the json results
+    sizes: list
+        Number of messages of each synthetic chat, ex: 10000 to 10000000
+    min_: int
+        Clip length passed to every case
+    repeat: int
+        Number of timed runs of each case, fastest run is kept
+    memory: bool
+        True to also run each case once under `tracemalloc` for its peak memory (slower)
+    load_max: int
+        Chats with more messages are not `json.load`ed, the algos read the file with
+        `stream_twitch_chat` and the cases that need a list are skipped
+    label: str or None
+        Name of this run, ex: a git branch, saved with the results
+    chat_kwargs:
+        Passed to `synthetic_chat.write_chat`, ex: num_chatters, chatter_skew, bursts, emote_rate
+
+    output
+    ------
+    suite: dict
+        {"meta": versions and settings, "results": one dict per (case, size)} as saved
+    """
+    suite = {
+        "meta": {
+            "label": label,
+            "date": dt.datetime.now().isoformat(timespec="seconds"),
+            "pillaralgos": pillaralgos.__version__,
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "machine": platform.platform(),
+            "min_": min_,
+            "repeat": repeat,
+            "chat_kwargs": chat_kwargs,
+        },
+        "results": [],
+    }
+    cases = suite_cases(min_)
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            chat_file = os.path.join(folder, f"synthetic_{size}.json")
+            syn.write_chat(chat_file, size, **chat_kwargs)
+            if size <= load_max:
+                with open(chat_file) as f:
+                    data = json.load(f)
+            else:
+                data = None
+            big_df = dh.stream_twitch_chat(chat_file).sort_values("created_at", kind="mergesort")
+
+            for case, (input_, fctn) in cases.items():
+                result = {"case": case, "num_messages": size}
+                if input_ == "list" and data is None:
+                    result["skipped"] = "too big to load"
+                    suite["results"].append(result)
+                    continue
+                if input_ == "file" or (input_ == "any" and data is None):
+                    kwargs = {"data": chat_file, "big_df": big_df}
+                    result["input"] = "file"
+                else:
+                    kwargs = {"data": data, "big_df": big_df}
+                    result["input"] = "df" if input_ == "df" else "list"
+                result["seconds"] = best_time(fctn, repeat=repeat, **kwargs)
+                result["messages_per_sec"] = size / result["seconds"]
+                if memory:
+                    result["peak_mb"] = peak_memory(fctn, **kwargs)
+                suite["results"].append(result)
+            del data, big_df
+
+    with open(filename, "w") as f:
+        json.dump(suite, f, indent=2)
+    return suite
+
+
+def compare_suites(old_filename, new_filename):
+    """
+    Lines up two `run_suite` results by case and size
+
+    output
+    ------
+    comparison: pd.DataFrame
+        seconds and peak_mb of both, with speedup (old seconds / new seconds) and
+        memory_ratio (new peak_mb / old peak_mb)
+    """
+    frames = []
+    for filename in [old_filename, new_filename]:
+        with open(filename) as f:
+            frames.append(pd.DataFrame(json.load(f)["results"]))
+    cols = [col for col in ["case", "num_messages", "seconds", "peak_mb"] if col in frames[1].columns]
+    comparison = frames[0][cols].merge(
+        frames[1][cols], on=["case", "num_messages"], suffixes=("_old", "_new")
+    )
+    comparison["speedup"] = comparison["seconds_old"] / comparison["seconds_new"]
+    if "peak_mb_new" in comparison.columns:
+        comparison["memory_ratio"] = comparison["peak_mb_new"] / comparison["peak_mb_old"]
+    return comparison
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pillaralgos on synthetic twitch chat")
+    parser.add_argument("filename", help="json file to save results to")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--min_", type=float, default=2)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no_memory", action="store_true", help="skip tracemalloc runs")
+    parser.add_argument("--load_max", type=int, default=1000000)
+    parser.add_argument("--label", default=None)
+    parser.add_argument("--num_chatters", type=int, default=1000)
+    parser.add_argument("--chatter_skew", type=float, default=0.0)
+    parser.add_argument("--bursts", type=int, default=0)
+    parser.add_argument("--emote_rate", type=float, default=0.3)
+    args = vars(parser.parse_args())
+    args["memory"] = not args.pop("no_memory")
+    run_suite(args.pop("filename"), **args)
@@ -0,0 +1,165 @@
+"""
+Seeded generator of fake twitch chat, in the same json format as the real chat logs.
+Useful to benchmark `pillaralgos` on streams of any size.
+
+HOW TO:
+    from pillaralgos_dev import synthetic_chat as syn
+    data = syn.make_chat(num_messages=10000)           # list of dicts
+    syn.write_chat("data/synthetic_5m.json", 5000000)  # written message by message
+    syn.write_chat("data/bursty.json", 100000, bursts=20, chatter_skew=1.2, emote_rate=0.5)
+
+    # or from the shell
+    python -m pillaralgos_dev.synthetic_chat data/synthetic_10m.json 10000000 --bursts 50
+"""
+import argparse
+import bisect
+import datetime as dt
+import itertools
+import json
+import random
+
+WORDS = ["hi", "lol", "pog", "gg", "nice", "what", "no", "yes", "wow", "clip", "it"]
+EMOTICONS = [("25", "Kappa"), ("1", ":)"), ("425618", "LUL"), ("114836", "Jebaited")]
+
+
+def iter_chat(
+    num_messages,
+    num_chatters=1000,
+    hours=3,
+    emote_rate=0.3,
+    seed=0,
+    chatter_skew=0.0,
+    bursts=0,
+    burst_sec=60,
+    burst_factor=10,
+):
+    """
+    Yields one twitch chat message (dict) at a time, in order of `created_at`
+
+    input
+    -----
+    num_messages: int
+        Number of messages in the stream
+    num_chatters: int
+        Number of unique commenters to pick from
+    hours: float
+        Length of the stream
+    emote_rate: float
+        Chance that a message has emoticons
+    seed: int
+        Seed for `random.Random`, same seed gives the same chat
+    chatter_skew: float
+        0 for every chatter to be as chatty as the others. Above 0, chatter k sends
+        messages in proportion to 1/k**chatter_skew (Zipf), so a few chatters send most of them.
+    bursts: int
+        Number of hype moments, placed at random, where chat goes `burst_factor` times faster
+    burst_sec: float
+        Length of each burst in seconds
+    burst_factor: float
+        How many times more messages per second during a burst
+    """
+    rnd = random.Random(seed)
+    first = dt.datetime(2021, 2, 20, 21, 17, 49)
+    # bursts get their own Random so that bursts=0 gives the same chat as before
+    burst_rnd = random.Random(seed + 1)
+    burst_starts = sorted(burst_rnd.uniform(0, hours * 3600 - burst_sec) for x in range(bursts))
+    # base time between messages, so that num_messages still take about `hours`
+    burst_time = sum(min(burst_sec, hours * 3600) for x in range(bursts)) * (burst_factor - 1)
+    step = (hours * 3600 + burst_time) / max(num_messages, 1)
+    if chatter_skew > 0:
+        weights = itertools.accumulate(1 / (k + 1) ** chatter_skew for k in range(num_chatters))
+        cum_weights = list(weights)
+    offset = 0.0
+    for i in range(num_messages):
+        in_burst = bisect.bisect_right(burst_starts, offset) - 1
+        if in_burst >= 0 and offset < burst_starts[in_burst] + burst_sec:
+            offset += rnd.expovariate(burst_factor / step)
+        else:
+            offset += rnd.expovariate(1 / step)
+        stamp = first + dt.timedelta(seconds=round(offset, 3))
+        stamp = stamp.strftime("%Y-%m-%dT%H:%M:%S.") + f"{stamp.microsecond // 1000:03d}Z"
+        if chatter_skew > 0:
+            chatter = bisect.bisect_left(cum_weights, rnd.random() * cum_weights[-1])
+        else:
+            chatter = rnd.randrange(num_chatters)
+        user_id = str(10000000 + chatter)
+
+        words = [rnd.choice(WORDS) for x in range(rnd.randint(1, 8))]
+        emoticons = []
+        if rnd.random() < emote_rate:
+            for x in range(rnd.randint(1, 3)):
+                emo_id, emo_name = rnd.choice(EMOTICONS)
+                begin = len(" ".join(words)) + 1
+                words.append(emo_name)
+                emoticons.append({"_id": emo_id, "begin": begin, "end": begin + len(emo_name) - 1})
+        body = " ".join(words)
+
+        message = {
+            "body": body,
+            "fragments": [{"text": body}],
+            "is_action": False,
+            "user_badges": [{"_id": "subscriber", "version": "3"}],
+            "user_color": "#0000FF",
+            "user_notice_params": {},
+        }
+        if emoticons:
+            message["emoticons"] = emoticons
+        yield {
+            "_id": f"{seed}-{i}",
+            "created_at": stamp,
+            "updated_at": stamp,
+            "channel_id": "73626243",
+            "content_type": "video",
+            "content_id": "922093896",
+            "content_offset_seconds": round(offset, 3),
+            "commenter": {
+                "display_name": f"chatter{user_id}",
+                "_id": user_id,
+                "name": f"chatter{user_id}",
+                "type": "user",
+                "bio": None,
+                "created_at": "2011-12-24T06:49:58.146829Z",
+                "updated_at": "2021-04-11T01:40:09.456979Z",
+                "logo": "https://static-cdn.jtvnw.net/user-default-pictures-uv/profile_image-300x300.png",
+            },
+            "source": "chat",
+            "state": "published",
+            "message": message,
+        }
+
+
+def make_chat(num_messages, **kwargs):
+    """
+    Returns `iter_chat` as a list of dictionaries, like `json.load` of a chat log
+    """
+    return list(iter_chat(num_messages, **kwargs))
+
+
+def write_chat(filename, num_messages, **kwargs):
+    """
+    Writes `iter_chat` to a json file one message at a time, so that files with
+    millions of messages never have to fit in memory
+    """
+    with open(filename, "w") as f:
+        f.write("[")
+        for i, message in enumerate(iter_chat(num_messages, **kwargs)):
+            if i > 0:
+                f.write(",")
+            f.write(json.dumps(message))
+        f.write("]")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic twitch chat json")
+    parser.add_argument("filename")
+    parser.add_argument("num_messages", type=int)
+    parser.add_argument("--num_chatters", type=int, default=1000)
+    parser.add_argument("--hours", type=float, default=3)
+    parser.add_argument("--emote_rate", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chatter_skew", type=float, default=0.0)
+    parser.add_argument("--bursts", type=int, default=0)
+    parser.add_argument("--burst_sec", type=float, default=60)
+    parser.add_argument("--burst_factor", type=float, default=10)
+    args = vars(parser.parse_args())
+    write_chat(args.pop("filename"), args.pop("num_messages"), **args)
@@ -6,130 +6,172 @@ HOW TO:
 
 ```
 algo1.run(data, min_=2, limit=10, sort_by='rel', save_json = False)
+algo1.sweep(data, mins=[1, 2, 3, 5, 10], limit=10)
 ```
 """
 
 import pandas as pd
+import numpy as np
 from .helpers import data_handler as d
 
 
-def perc_uniques(chunk_list, min_, total_uniques, big_unique):
+def chunk_uniques(big_df, bounds, min_, features=None, precision=None, sketches=None):
     """
-    Finds the percent unique chatters for each dataframe in the list. Dataframes
-    assumed to be split using xminChats.find_rest.
+    Finds the number and percent of unique chatters in every chunk and hour at once,
+    from the chatters of a `data_handler.featureStore`, or estimated from the
+    HyperLogLog sketches of a `data_handler.sketchStore` if `precision` is given
+
+    ### Input
+    -----
+    ```
+    big_df: pd.DataFrame
+        Df of the entire twitch session, sorted by `created_at`
+    bounds: tuple
+        Output of `data_handler.chunk_bounds` for big_df
+    min_: int
+        How long a timestamp range should be
+    features: data_handler.featureStore or None
+        Features of big_df, found here if not given. Not used with `precision`.
+    precision: int or None
+        If given, unique chatters are estimated with HyperLogLog sketches of 2**precision
+        registers, about 1.04/sqrt(2**precision) off. If None, exact counts.
+    sketches: data_handler.sketchStore or None
+        Only with `precision`. Sketches of big_df, found here if not given.
+    ```
+    ### Output
+    ------
+    ```
+    results: pd.DataFrame
+        One row per chunk, in order, with `hour` (starting at 1), `{min_}min_chunk`,
+        `start`, `end`, `num_unique`, `perc_rel_unique`, `perc_abs_unique` columns
+    ```
     """
+    first_sec, hour_bounds, chunk_bounds = bounds
+    stamps = big_df["created_at"].values
 
-    perc_unique = {
-        f"{min_}min_chunk": [],
-        "start": [],
-        "end": [],
-        "num_unique": [],
-        "perc_rel_unique": [],
-        "perc_abs_unique": [],
-    }
-
-    for i in range(len(chunk_list)):
-        # calcuate
-        chunk = i
-        unique = len(chunk_list[i]["_id"].unique())
-        timestamp = [
-            chunk_list[i]["created_at"].min(),
-            chunk_list[i]["created_at"].max(),
-        ]
-        perc_rel = (
-            unique / total_uniques
-        )  # this is the total uniques in THAT DATAFRAME, ie the hourly cut
-        perc_abs = (
-            unique / big_unique
-        )  # this is the total uniques in the entire twitch session
-        # store
-        perc_unique[f"{min_}min_chunk"].append(chunk)
-        perc_unique["start"].append(timestamp[0])
-        perc_unique["end"].append(timestamp[1])
-        perc_unique["num_unique"].append(unique)
-        perc_unique["perc_rel_unique"].append(perc_rel)
-        perc_unique["perc_abs_unique"].append(perc_abs)
-
-    df_unique = pd.DataFrame(perc_unique)
-    df_unique["elapsed"] = df_unique["end"] - df_unique["start"]
-    return df_unique
-
-
-def hour_iterator(big_df, limit, min_=2, sort_by="rel"):
+    if precision is None:
+        if features is None:
+            features = d.featureStore(big_df)
+        # total unique chatters in each hour, and in the entire twitch session
+        hour_uniques = features.uniques(hour_bounds[:, 0], hour_bounds[:, 1])
+        max_uniques = features.num_chatters
+        num_unique = features.uniques(chunk_bounds[:, 2], chunk_bounds[:, 3])
+    else:
+        if sketches is None:
+            sketches = d.sketchStore(big_df, precision=precision)
+        starts = np.concatenate([chunk_bounds[:, 2], hour_bounds[:, 0], [0]])
+        stops = np.concatenate([chunk_bounds[:, 3], hour_bounds[:, 1], [len(big_df)]])
+        estimates = np.rint(sketches.uniques(starts, stops)).astype(np.int64)
+        num_unique = estimates[: len(chunk_bounds)]
+        hour_uniques = estimates[len(chunk_bounds) : -1]
+        max_uniques = estimates[-1]
+
+    results = pd.DataFrame(
+        {
+            "hour": chunk_bounds[:, 0] + 1,
+            f"{min_}min_chunk": chunk_bounds[:, 1],
+            "start": stamps[chunk_bounds[:, 2]],
+            "end": stamps[chunk_bounds[:, 3] - 1],
+            "num_unique": num_unique,
+            # relative to the total uniques in THAT HOUR
+            "perc_rel_unique": num_unique / hour_uniques[chunk_bounds[:, 0]],
+            # relative to the total uniques in the entire twitch session
+            "perc_abs_unique": num_unique / max_uniques,
+        }
+    )
+    return results
+
+
+def hour_iterator(
+    big_df,
+    limit,
+    min_=2,
+    sort_by="rel",
+    bounds=None,
+    scores=False,
+    features=None,
+    precision=None,
+    profiler=None,
+    sketches=None,
+):
     """
-    Pushes all dfs in a list through the xminChats function, returns a dataframe of results
+    Splits big_df into hours and `min_` chunks with `data_handler.chunk_bounds`, finds
+    the percent unique chatters of every chunk with `chunk_uniques`, returns a
+    dataframe of results
 
     ### Input
     -----
     ```
     big_df: pd.DataFrame
-        Df of the entire twitch session. This is the one that was split by dfSplitter class
+        Df of the entire twitch session
     min_: int
         How long a timestamp range should be
     sort_by: str
         Whether to sort values by `abs` or `rel` unique chatters.
+    bounds: tuple or None
+        Output of `data_handler.chunk_bounds` for big_df. If given, hours and chunks
+        are sliced from it instead of splitting big_df again.
+    scores: bool
+        True to keep the `perc_{sort_by}_unique` of each chunk in json_results as `score`
+    features: data_handler.featureStore or None
+        Passed to `chunk_uniques`
+    precision: int or None
+        Passed to `chunk_uniques`
+    sketches: data_handler.sketchStore or None
+        Passed to `chunk_uniques`
+    profiler: data_handler.stageProfiler or None
+        Records the time of `chunk_uniques`, the sort and `results_jsonified`
     ```
     """
-    ds = d.dfSplitter(big_df)  # initiate
-    ds.find_rest()  # split big_df into 1 hour long separate dfs
-    hour_list = (
-        ds.result
-    )  # result stored in class var. NOTE: index 0 is always the very first timestamp of big_df
-    first_sec = hour_list[0]
-    hour_list = hour_list[1:]
-
-    # initiate empty results df
-    results = pd.DataFrame(
-        columns=[
-            "hour",
-            f"{min_}min_chunk",
-            "start",
-            "end",
-            "num_unique",
-            "perc_rel_unique",
-            "perc_abs_unique",
-        ]
-    )
-    max_uniques = len(
-        big_df["_id"].unique()
-    )  # the total number of unique chatters for the entire twitch session
-
-    # iterate all sections through the class
-    for i in range(len(hour_list)):
-        fm = d.xminChats(hour_list[i], max_uniques, min_=min_)
-        fm.find_rest()  # _n not needed
-        chunk_list = fm.result  # get back list of dfs, each 2 minutes long
-
-        hr_uniques = perc_uniques(
-            chunk_list, min_, total_uniques=fm.total_uniques, big_unique=fm.big_unique
+    if bounds is None:
+        big_df = big_df.sort_values("created_at", kind="mergesort")
+        bounds = d.chunk_bounds(big_df, min_=min_)
+    # NOTE: first_sec is always the very first timestamp of big_df
+    first_sec = bounds[0]
+    with d.profile_stage(profiler, "algo1.chunk_uniques", rows=len(bounds[2])):
+        results = chunk_uniques(
+            big_df, bounds, min_, features=features, precision=precision, sketches=sketches
+        )
+
+    with d.profile_stage(profiler, "algo1.sort", rows=len(results)):
+        results["elapsed"] = results["end"] - results["start"]  # to double check length
+        results = results.sort_values(f"perc_{sort_by}_unique", ascending=False)
+        results = results.head(limit)
+        pretty_results = results.reset_index(drop=True)  # prettify
+        pretty_results = pretty_results.sort_values(
+            f"perc_{sort_by}_unique", ascending=False
         )
-        hr_uniques["hour"] = i + 1
-        results = results.append(hr_uniques)
-
-    results["elapsed"] = results["end"] - results["start"]  # to double check length
-    results = results.sort_values(f"perc_{sort_by}_unique", ascending=False)
-    results = results.head(limit)
-    pretty_results = results.reset_index(drop=True)  # prettify
-    pretty_results = pretty_results.sort_values(
-        f"perc_{sort_by}_unique", ascending=False
-    )
     # results_jsonified sorts by top calc
-    json_results = d.results_jsonified(
-        results, first_sec, results_col=f"perc_{sort_by}_unique"
-    )  
+    with d.profile_stage(profiler, "algo1.results_jsonified", rows=len(results)):
+        json_results = d.results_jsonified(
+            results, first_sec, results_col=f"perc_{sort_by}_unique", keep_score=scores
+        )
 
     return pretty_results, json_results # results sorted by percent unique
 
 
-def run(data, min_=2, limit=10, sort_by="rel", save_json=False):
+def run(
+    data,
+    min_=2,
+    limit=10,
+    sort_by="rel",
+    save_json=False,
+    scores=False,
+    step=None,
+    precision=None,
+    profile=None,
+    cache=None,
+    frame_cache=None,
+):
     """
     Runs algo1 to sort timestamps by the relative percentage of chatters by default.
 
     ### Input
     ------
     ```
-    data: list
-        List of dictionaries of data from Twitch chat
+    data: list, pd.DataFrame, Arrow table or data_handler.chatFrame
+        List of dictionaries of data from Twitch chat, or the same already organized
+        with `data_handler.chatFrame(data)`, or as a df/Arrow table (see `data_handler.ORGANIZED_SCHEMA`)
     min_: int
         Approximate number of minutes each clip should be
     limit: int
@@ -139,14 +181,101 @@ def run(data, min_=2, limit=10, sort_by="rel", save_json=False):
         'abs': "number of chatters at timestamp"/"total number of chatters in stream"
     save_json: bool
         True if want to save results as json to exports folder
+    scores: bool
+        True to add each clip's `perc_{sort_by}_unique` to its dictionary as `score`
+    step: float or None
+        Seconds between the starts of overlapping `min_` windows, see `data_handler.sliding_bounds`.
+        If None, back to back chunks from `data_handler.chunk_bounds`.
+    precision: int or None
+        Estimate unique chatters with HyperLogLog sketches of 2**precision registers instead
+        of counting them exactly, see `chunk_uniques`. 12 is about 1.6% off. Skips the exact
+        `data_handler.featureStore`, so it is faster and smaller on long streams.
+    profile: bool, function, data_handler.stageProfiler or None
+        Records the time, rows and (optionally) memory of each stage, see `data_handler.stageProfiler`.
+        If True, returns (json_results, stages) instead of json_results.
+    cache: data_handler.resultCache or None
+        Returns the result of an earlier run with the same chat and params from the cache,
+        see `data_handler.resultCache`. Not used when profiling.
+    frame_cache: str or None
+        Folder of organized chats, only used when data is a path or open file, see `data_handler.chatFrame`
     ```
     """
-    data = pd.DataFrame.from_records(data)
-    big_df = d.organize_twitch_chat(data)  # fetch appropriate data
+    if cache is not None and profile is None:
+        json_results = cache.run(
+            run,
+            data,
+            min_=min_,
+            limit=limit,
+            sort_by=sort_by,
+            scores=scores,
+            step=step,
+            precision=precision,
+            frame_cache=frame_cache,
+            unkeyed=("frame_cache",),  # only where the chat is loaded from
+        )
+        # saved here, a result found in the cache never reaches the save_json below
+        if save_json and type(json_results) == list:
+            d.save_json(json_results, name=f"algo1_perc_{sort_by}_unique")
+        return json_results
+    chat = d.get_chat(data, profile, frame_cache)
+    big_df = chat.big_df  # fetch appropriate data
     if type(big_df) == pd.DataFrame:
-        results, json_results = hour_iterator(big_df, min_=min_, sort_by=sort_by, limit=limit)
+        with d.profile_stage(chat.profiler, "algo1.run", rows=len(big_df)):
+            bounds = chat.get_bounds(min_, step=step)
+            if precision is None:
+                features, sketches = chat.get_features(), None
+            else:
+                features, sketches = None, chat.get_sketches(precision)
+            results, json_results = hour_iterator(
+                big_df,
+                min_=min_,
+                sort_by=sort_by,
+                limit=limit,
+                bounds=bounds,
+                scores=scores,
+                features=features,
+                precision=precision,
+                profiler=chat.profiler,
+                sketches=sketches,
+            )
         if save_json:
             d.save_json(json_results, name=f"algo1_perc_{sort_by}_unique")
-        return json_results
+        return d.profiled_results(json_results, profile, chat.profiler)
     else:
-        return big_df # this is an empty numpy array if it is not a DF.
\ No newline at end of file
+        return d.profiled_results(big_df, profile, chat.profiler) # this is an empty numpy array if it is not a DF.
+
+
+def sweep(data, mins=[1, 2, 3, 5, 10], limit=10, profile=None, frame_cache=None, **kwargs):
+    """
+    Runs algo1 for every `min_` in mins in one call. The chat is organized once and
+    shared by every run, only the chunks of each `min_` are new.
+
+    ### Input
+    ------
+    ```
+    data: list, pd.DataFrame, Arrow table or data_handler.chatFrame
+        List of dictionaries of data from Twitch chat, or the same already organized
+        with `data_handler.chatFrame(data)`, or as a df/Arrow table (see `data_handler.ORGANIZED_SCHEMA`)
+    mins: list
+        Every `min_` to run
+    limit: int
+        Number of rows/dictionaries/timestamps to return for each `min_`
+    profile: bool, function, data_handler.stageProfiler or None
+        Records the stages of every run in one profiler, see `data_handler.stageProfiler`.
+        If True, returns (sweep_results, stages) instead of sweep_results.
+    frame_cache: str or None
+        Folder of organized chats, only used when data is a path or open file, see `data_handler.chatFrame`
+    kwargs:
+        Passed to `run`, ex: sort_by=...
+    ```
+
+    ### Output
+    ------
+    ```
+    sweep_results: dict
+        min_:json_results of `run`
+    ```
+    """
+    chat = d.get_chat(data, profile, frame_cache)
+    sweep_results = {min_: run(chat, min_=min_, limit=limit, **kwargs) for min_ in mins}
+    return d.profiled_results(sweep_results, profile, chat.profiler)
@@ -5,95 +5,59 @@ isolates to each `min_` timestamp, and sorts the resulting df by largest number
 HOW TO
 ```
 algo2.run(data, min_=2, limit=10, save_json = False)
+algo2.sweep(data, mins=[1, 2, 3, 5, 10], limit=10)
 ```
 """
 import pandas as pd
-import datetime as dt
+import numpy as np
 from .helpers import data_handler as d
 
 
-def thalamus(dataframe, min_):
+def thalamus(dataframe, min_, bounds=None, features=None):
     """
-    Formats data for rate_finder(), gets chunk_list to pass through rate_finder
+    Finds the mean chat rate per user of every chunk, from the message and unique
+    chatter counts of a `data_handler.featureStore`. Every user in a chunk shares the
+    chunk's time span, so the mean of their rates is the chunk's messages per user
+    over that span. `bounds` is the output of `data_handler.chunk_bounds` for
+    dataframe, found here if not given, same for `features`.
     """
-    # split into hours
-    first_stamp, chunk_list = d.get_chunks(dataframe, min_=min_)
-    
-    chat_rates = pd.DataFrame(
-        columns=["hour", "chunk", "start", "end", "_id", "num_chats", f"chats_per_{min_}min"]
+    if bounds is None:
+        dataframe = dataframe.sort_values("created_at", kind="mergesort")
+        bounds = d.chunk_bounds(dataframe, min_=min_)
+    if features is None:
+        features = d.featureStore(dataframe)
+    first_stamp, hour_bounds, chunk_bounds = bounds
+    starts, stops = chunk_bounds[:, 2], chunk_bounds[:, 3]
+
+    stamps = dataframe["created_at"].values
+    time_d = ((stamps[stops - 1] - stamps[starts]) // np.timedelta64(1, "us")) / 10 ** 6
+    # if there is only 1 timestamp in the chunk, assume that time_d = X
+    time_d = np.where(time_d == 0, min_, time_d)
+    chats_per_user = features.sums("messages", starts, stops) / features.uniques(starts, stops)
+
+    chat_rates_mean = pd.DataFrame(
+        {
+            "start": stamps[starts],
+            "end": stamps[stops - 1],
+            f"chats_per_{min_}min": (chats_per_user / time_d) * 60 * min_,
+        }
     )
-    # for each 2 min chunk
-    for chunk in chunk_list:
-        # find the chat rate for each user
-        chat_rates = chat_rates.append(rate_finder(dataframe=chunk, x = min_))
-
-    chat_rates = chat_rates.reset_index(drop=True)
-    chat_rates_mean = chat_rates.groupby(['start','end']).mean().reset_index()
     chat_rates_mean = chat_rates_mean.sort_values(f"chats_per_{min_}min", ascending=False) # sorted by top mean chat rates
-    
 
     return chat_rates_mean, first_stamp
 
 
-def rate_finder(dataframe, x=2):
-    """
-    Finds the rate of messages sent per X minutes for each user in the dataframe (assumed to be a chunk).
-
-    **NOTE**: if only 1 timestamp in chunk dataframe, assumes the chunk is exactly X minutes before the next chunk in the entire twitch chat stream
-    """
-    # Initiate new df
-    id_results_all = pd.DataFrame(
-        columns=[
-            "_id",
-            "num_chats",
-            f"chats_per_{x}min",
-        ]
-    )
-    chatters = dataframe["_id"].unique()  # id unique chatters for this chunk
-    hour = dataframe['hour'].unique()[0] # each hour is the same 
-    chunk = dataframe['chunk'].unique()[0] # each chunk is the same
-    time_start = dataframe.iloc[0, 0] 
-    time_end = dataframe.iloc[-1, 0]
-    time_d = dt.timedelta.total_seconds(time_end - time_start)
-    for i in range(len(chatters)):
-        temp_df = dataframe[dataframe["_id"] == chatters[i]]  # isolate chatter's data
-
-        _id = chatters[i]
-        num_chats = len(temp_df["body"])  # count how many chats were sent by them
-
-        if time_d > 0:
-            chat_rate = (
-                (num_chats / time_d) * 60 * x
-            )  # use time_d to calculate chat/sec, then multiply to get user requested rate
-        elif time_d == 0:
-            # if there is only 1 message in the chunk, there will be only 1 timestamp
-            # in that case assume that time_d = X
-            time_d = x
-            chat_rate = (num_chats / time_d) * 60 * x  # convert to chat/X minutes
-        else:
-            chat_rate = (
-                -100
-            )  # if number is negative, math is wrong somewhere and needs to be looked into
-
-        # gather results
-        id_results = pd.DataFrame(
-            {
-                "_id": [_id],
-                "num_chats": [num_chats],
-                f"chats_per_{x}min": [chat_rate],
-            }
-        )
-        id_results_all = id_results_all.append(id_results)  # store in df
-    
-    chat_rate_df = id_results_all.copy()
-    chat_rate_df['hour'] = hour
-    chat_rate_df['chunk'] = chunk
-    chat_rate_df['start'] = time_start
-    chat_rate_df['end'] = time_end
-    return chat_rate_df.reset_index(drop=True)
-
-
-def run(data, min_=2, limit=10, save_json=False):
+def run(
+    data,
+    min_=2,
+    limit=10,
+    save_json=False,
+    scores=False,
+    step=None,
+    profile=None,
+    cache=None,
+    frame_cache=None,
+):
     """
     Runs algo2 to find the mean chat_rate per unique user per `min_` chunk,
     takes the means for each chunk, and then sorts by the highest mean rate.
@@ -101,14 +65,28 @@ def run(data, min_=2, limit=10, save_json=False):
     ### Input
     ------
     ```
-    data: list
-        List of dictionaries of data from Twitch chat
+    data: list, pd.DataFrame, Arrow table or data_handler.chatFrame
+        List of dictionaries of data from Twitch chat, or the same already organized
+        with `data_handler.chatFrame(data)`, or as a df/Arrow table (see `data_handler.ORGANIZED_SCHEMA`)
     min_: int
         Approximate number of minutes each clip should be
     limit: int
         Number of rows/dictionaries/timestamps to return
     save_json: bool
         True if want to save results as json to exports folder
+    scores: bool
+        True to add each clip's `chats_per_{min_}min` to its dictionary as `score`
+    step: float or None
+        Seconds between the starts of overlapping `min_` windows, see `data_handler.sliding_bounds`.
+        If None, back to back chunks from `data_handler.chunk_bounds`.
+    profile: bool, function, data_handler.stageProfiler or None
+        Records the time, rows and (optionally) memory of each stage, see `data_handler.stageProfiler`.
+        If True, returns (json_results, stages) instead of json_results.
+    cache: data_handler.resultCache or None
+        Returns the result of an earlier run with the same chat and params from the cache,
+        see `data_handler.resultCache`. Not used when profiling.
+    frame_cache: str or None
+        Folder of organized chats, only used when data is a path or open file, see `data_handler.chatFrame`
     ```
 
     ### Output
@@ -119,17 +97,75 @@ def run(data, min_=2, limit=10, save_json=False):
             Ex: [{start:TIMESTAMP_INT, end:TIMESTAMP_INT}]
     ```            
     """
-    data = pd.DataFrame.from_records(data)
-    big_df = d.organize_twitch_chat(data)  # fetch appropriate data
+    if cache is not None and profile is None:
+        json_results = cache.run(
+            run,
+            data,
+            min_=min_,
+            limit=limit,
+            scores=scores,
+            step=step,
+            frame_cache=frame_cache,
+            unkeyed=("frame_cache",),  # only where the chat is loaded from
+        )
+        # saved here, a result found in the cache never reaches the save_json below
+        if save_json and type(json_results) == list:
+            d.save_json(json_results, f"algo2_mean_rate_per_{min_}min")
+        return json_results
+    chat = d.get_chat(data, profile, frame_cache)
+    big_df = chat.big_df  # fetch appropriate data
     if type(big_df) == pd.DataFrame:
-        results, first_stamp = thalamus(big_df, min_)
-        results = results.head(limit)
-        # results_jsonified sorts by top calc
-        json_results = d.results_jsonified(results, first_stamp, f"chats_per_{min_}min")
+        with d.profile_stage(chat.profiler, "algo2.run", rows=len(big_df)):
+            bounds = chat.get_bounds(min_, step=step)
+            features = chat.get_features()
+            with d.profile_stage(chat.profiler, "algo2.thalamus", rows=len(bounds[2])):
+                results, first_stamp = thalamus(big_df, min_, bounds=bounds, features=features)
+            results = results.head(limit)
+            # results_jsonified sorts by top calc
+            with d.profile_stage(chat.profiler, "algo2.results_jsonified", rows=len(results)):
+                json_results = d.results_jsonified(
+                    results, first_stamp, f"chats_per_{min_}min", keep_score=scores
+                )
 
         if save_json:
             d.save_json(json_results, f"algo2_mean_rate_per_{min_}min")
 
-        return json_results
+        return d.profiled_results(json_results, profile, chat.profiler)
     else:
-        return big_df # this is an empty numpy array if it is not a DF.
\ No newline at end of file
+        return d.profiled_results(big_df, profile, chat.profiler) # this is an empty numpy array if it is not a DF.
+
+
+def sweep(data, mins=[1, 2, 3, 5, 10], limit=10, profile=None, frame_cache=None, **kwargs):
+    """
+    Runs algo2 for every `min_` in mins in one call. The chat is organized once and
+    shared by every run, only the chunks of each `min_` are new.
+
+    ### Input
+    ------
+    ```
+    data: list, pd.DataFrame, Arrow table or data_handler.chatFrame
+        List of dictionaries of data from Twitch chat, or the same already organized
+        with `data_handler.chatFrame(data)`, or as a df/Arrow table (see `data_handler.ORGANIZED_SCHEMA`)
+    mins: list
+        Every `min_` to run
+    limit: int
+        Number of rows/dictionaries/timestamps to return for each `min_`
+    profile: bool, function, data_handler.stageProfiler or None
+        Records the stages of every run in one profiler, see `data_handler.stageProfiler`.
+        If True, returns (sweep_results, stages) instead of sweep_results.
+    frame_cache: str or None
+        Folder of organized chats, only used when data is a path or open file, see `data_handler.chatFrame`
+    kwargs:
+        Passed to `run`, ex: scores=True
+    ```
+
+    ### Output
+    ------
+    ```
+    sweep_results: dict
+        min_:json_results of `run`
+    ```
+    """
+    chat = d.get_chat(data, profile, frame_cache)
+    sweep_results = {min_: run(chat, min_=min_, limit=limit, **kwargs) for min_ in mins}
+    return d.profiled_results(sweep_results, profile, chat.profiler)
@@ -1,109 +1,165 @@
 """
-This script finds the top 10 active users, timestamps where they participated,
+This script finds the top 10 (or `top_n`) active users, timestamps where they participated,
 filtered by at least `min_words` number of words sent by the user per stamp
 
 HOW TO
 ```
-algo3_0.run(data, min_=2, limit=10, min_words=5, save_json = False)
+algo3_0.run(data, min_=2, limit=10, min_words=5, top_n=10, save_json = False)
+algo3_0.sweep(data, mins=[1, 2, 3, 5, 10], limit=10)
 ```
 """
 import pandas as pd
+import numpy as np
 from .helpers import data_handler as dh
 
 
-def thalamus(big_df, min_, goal, min_words):
+def thalamus(
+    big_df, min_, goal, min_words, bounds=None, top_n=10, profiler=None, id_words=None
+):
     '''
     Coordinates the other functions in this algo and data_helper. Separate from 
-    `run()` for sanity purposes.
+    `run()` for sanity purposes. `bounds` is the output of `data_handler.chunk_bounds`
+    for big_df, found here if not given, same for `id_words` (`id_words_counter`).
+    `profiler` (a `data_handler.stageProfiler`) records the time of each step.
     '''
+    if bounds is None:
+        big_df = big_df.sort_values("created_at", kind="mergesort")
+        bounds = dh.chunk_bounds(big_df, min_=min_)
+    first_stamp, hour_bounds, chunk_bounds = bounds
 
-    id_words = id_words_counter(big_df)
-    first_stamp, chunk_list = dh.get_chunks(big_df, min_=min_)
-    top_chunks = new_chunk_list(id_words, chunk_list, min_words=min_words)
-    results = results_formatter(top_chunks, goal=goal) # sorted by top goal
+    if id_words is None:
+        with dh.profile_stage(profiler, "algo3_0.id_words_counter", rows=len(big_df)):
+            id_words = id_words_counter(big_df)
+    with dh.profile_stage(profiler, "algo3_0.participation_matrix", rows=len(big_df)):
+        participation = participation_matrix(big_df, chunk_bounds)
+    with dh.profile_stage(profiler, "algo3_0.top_user_chunks", rows=len(chunk_bounds)):
+        results = top_user_chunks(
+            id_words,
+            participation,
+            big_df["created_at"].values,
+            chunk_bounds,
+            min_words=min_words,
+            top_n=top_n,
+            goal=goal,
+        )  # sorted by top goal
 
     return results, first_stamp
 
 
-def results_formatter(list_chunk, goal):
+def participation_matrix(big_df, bounds):
     """
-    Creates a new df `results` that contains the total number of words in the dataframe, the time
-    the time the dataframe started and ended
-    
+    Counts how many messages each user sent in each chunk, in one grouped count
+
     ### Input
     -----
     ```
-    list_chunk: list
-        List of pd.DataFrame
+    big_df: pd.DataFrame
+        Twitch stream chat df, sorted by `created_at`
+    bounds: np.array
+        One [hour, chunk, start, stop] row per chunk, from `data_handler.chunk_bounds`
+    ```
+    ### Output
+    ------
+    ```
+    participation: pd.Series
+        Sparse user x chunk matrix. Indexed by (`_id`, `chunk`), where `chunk` is
+        the row of the chunk in bounds, and only has the non zero counts.
+    ```
+    """
+    chunk_df, offsets = dh.label_chunks(big_df[["_id"]], bounds)
+    chunk_df["chunk"] = np.repeat(np.arange(len(bounds)), offsets[:, 1] - offsets[:, 0])
+    participation = chunk_df.groupby(["_id", "chunk"]).size()
+    return participation
+
+
+def top_user_chunks(
+    id_words, participation, stamps, bounds, min_words, top_n=10, goal="num_top_user_appears"
+):
+    """
+    Keeps only chunks where one of the `top_n` users sent more than `min_words`
+    messages, scored by how many messages that top user sent.
+
+    **NOTE**: a chunk picked by more than one top user is scored by the last of them
+    in `id_words` order
+
+    ### Input
+    -----
+    ```
+    id_words: pd.DataFrame
+        Output of `id_words_counter`
+    participation: pd.Series
+        Output of `participation_matrix`
+    stamps: np.array
+        `created_at` col of the df the bounds were found on
+    bounds: np.array
+        One [hour, chunk, start, stop] row per chunk, from `data_handler.chunk_bounds`
+    min_words: int
+        When filtering chunks to top users, at least how many words the top user should send
+    top_n: int
+        How many of the users that sent the most words count as top users
     goal: str
-        Col name that has calculated results (ex: num_words, chat_rate, etc.)
+        Name of the col to store the score in
     ```
     ### Output
     ------
     ```
     results: pd.DataFrame
-        Dataframe with `start`, `end`, `num_words` columns
+        Dataframe with `start`, `end`, goal columns, sorted by goal
     ```
     """
-    time_start_list = []
-    time_end_list = []
-    goal_list = []
-
-    for chunk in list_chunk:
-        time_start_list.append(chunk.iloc[0, 0])  # assume created_at col is first
-        time_end_list.append(chunk.iloc[-1, 0])  # assume created_at col is first
-        goal_list.append(chunk[goal].sum())
+    top_users = id_words.head(top_n)["_id"].values
+    users = participation.index.get_level_values("_id")
+    # dense top_n x chunk slice of the sparse participation matrix
+    top_matrix = (
+        participation[users.isin(top_users)]
+        .unstack(fill_value=0)
+        .reindex(index=top_users, columns=range(len(bounds)), fill_value=0)
+        .values
+    )
+    picked = top_matrix > min_words
+    last_user = len(top_users) - 1 - np.argmax(picked[::-1], axis=0)
+    score = top_matrix[last_user, np.arange(len(bounds))]
 
+    user_i, chunk_i = np.nonzero(picked)  # by user, then by chunk
     results = pd.DataFrame(
-        {"start": time_start_list, "end": time_end_list, goal: goal_list}
+        {
+            "start": stamps[bounds[chunk_i, 2]],
+            "end": stamps[bounds[chunk_i, 3] - 1],
+            goal: score[chunk_i],
+        }
     )
     results = results.sort_values(goal, ascending=False).drop_duplicates()
     return results
 
 
-def new_chunk_list(id_words, chunk_list, min_words):
-    """
-    Creates a new list of chunks, containing only chunks where top
-    users sent more than `min_words` words
-    """
-    user_dict = {}  # store chunks of the top 10 users
-    for user in id_words.head(10)["_id"]:
-        user_dict[user] = []
-    for user in user_dict.keys():
-        for chunk in chunk_list:
-            chunk["_id"] = chunk["_id"].astype(int)
-            if sum(chunk["_id"] == user) > min_words:
-                user_dict[user].append(chunk)
-    top_chunks = []
-    for user, value in user_dict.items():
-        if len(value) > 0:
-            for chunk in value:
-                chunk["num_top_user_appears"] = chunk["_id"] == user
-                top_chunks.append(chunk)
-    return top_chunks
-
-
-def id_words_counter(big_df):
+def id_words_counter(big_df, features=None):
     """
     Returns a dataframe with all user IDs and the number of words/emojis/combined
-    they each sent, sorted by top senders
+    they each sent, sorted by top senders. Summed from the per chatter totals of
+    `features` (a `data_handler.featureStore` of big_df) if given.
     """
-    id_words = pd.DataFrame(columns=["_id", "num_words", "num_emoji"])
-
-    for _id in big_df["_id"].unique():
-        temp_df = big_df[big_df["_id"] == _id]
-        words = temp_df["body"].str.split(" ")
-        if 'emoticons' in temp_df.columns:
-            emoji = temp_df["emoticons"].apply(lambda x: 0 if type(x) == float else len(x))
-            num_emoji = emoji.sum()
-        else:
-            num_emoji = 0.0
-        num_words = words.apply(lambda x: len(x))
-
-        sum_words = num_words.sum()
-        id_words = id_words.append(
-            {"_id": _id, "num_words": sum_words, "num_emoji": num_emoji},
-            ignore_index=True,
+    if features is None:
+        # same as len(body.split(" ")) and len(emoticons), also from a compact chat's counts
+        message_features = dh.message_features(big_df)
+        id_words = (
+            pd.DataFrame(
+                {
+                    "_id": big_df["_id"].values,
+                    "num_words": message_features["num_words_emo"],
+                    "num_emoji": message_features["num_emo"],
+                }
+            )
+            .groupby("_id", sort=False)  # users in order of their first message
+            .sum()
+            .reset_index()
+        )
+    else:
+        id_words = pd.DataFrame(
+            {
+                "_id": features.chatter_ids,  # also in order of their first message
+                "num_words": features.chatter_sums("num_words_emo"),
+                "num_emoji": features.chatter_sums("num_emo"),
+            }
         )
     id_words = id_words.astype({"_id": int, "num_words": int, "num_emoji": int})
     id_words["only_words"] = id_words["num_words"] - id_words["num_emoji"]
@@ -119,9 +175,21 @@ def id_words_counter(big_df):
     return id_words
 
 
-def run(data, min_=2, limit=10, min_words=5, save_json=False):
+def run(
+    data,
+    min_=2,
+    limit=10,
+    min_words=5,
+    top_n=10,
+    save_json=False,
+    scores=False,
+    profile=None,
+    cache=None,
+    frame_cache=None,
+    id_words=None,
+):
     """
-    Runs algo3_0 to extract only those chunks where the top 10 users participated.
+    Runs algo3_0 to extract only those chunks where the top 10 (`top_n`) users participated.
       - Top users are defined as "sent the most words in the entire twitch stream".
       - Once top users are identified, only those chunks are returned where top users
         sent at least `min_words` number of words.
@@ -129,16 +197,31 @@ def run(data, min_=2, limit=10, min_words=5, save_json=False):
     ### Input
     ------
     ```
-    data: list
-        List of dictionaries of data from Twitch chat
+    data: list, pd.DataFrame, Arrow table or data_handler.chatFrame
+        List of dictionaries of data from Twitch chat, or the same already organized
+        with `data_handler.chatFrame(data)`, or as a df/Arrow table (see `data_handler.ORGANIZED_SCHEMA`)
     min_: int
         Approximate number of minutes each clip should be
     limit: int
         Number of rows/dictionaries/timestamps to return
     min_words:int
         When filtering chunks to top users, at least how many words the top user should send
+    top_n: int
+        How many of the users that sent the most words count as top users
     save_json: bool
         True if want to save results as json to exports folder
+    scores: bool
+        True to add each clip's `num_top_user_appears` to its dictionary as `score`
+    profile: bool, function, data_handler.stageProfiler or None
+        Records the time, rows and (optionally) memory of each stage, see `data_handler.stageProfiler`.
+        If True, returns (json_results, stages) instead of json_results.
+    cache: data_handler.resultCache or None
+        Returns the result of an earlier run with the same chat and params from the cache,
+        see `data_handler.resultCache`. Not used when profiling.
+    frame_cache: str or None
+        Folder of organized chats, only used when data is a path or open file, see `data_handler.chatFrame`
+    id_words: pd.DataFrame or None
+        Output of `id_words_counter` for data, found here if not given. `sweep` counts it once for every `min_`.
     ```
     ### Output
     ------
@@ -148,17 +231,97 @@ def run(data, min_=2, limit=10, min_words=5, save_json=False):
             Ex: [{start:TIMESTAMP_INT, end:TIMESTAMP_INT}]
     ```
     """
-    data = pd.DataFrame.from_records(data)
-    big_df = dh.organize_twitch_chat(data)  # fetch appropriate data
+    if cache is not None and profile is None:
+        json_results = cache.run(
+            run,
+            data,
+            min_=min_,
+            limit=limit,
+            min_words=min_words,
+            top_n=top_n,
+            scores=scores,
+            frame_cache=frame_cache,
+            unkeyed=("frame_cache",),  # only where the chat is loaded from
+        )
+        # saved here, a result found in the cache never reaches the save_json below
+        if save_json and type(json_results) == list:
+            dh.save_json(json_results, "algo3.0_top_user_appears")
+        return json_results
+    chat = dh.get_chat(data, profile, frame_cache)
+    big_df = chat.big_df  # fetch appropriate data
     if type(big_df) == pd.DataFrame:
-        results, first_stamp = thalamus(big_df, min_=min_, min_words=min_words, goal="num_top_user_appears")
-        results = results.head(limit)
-        
-        # results_jsonified sorts by top calc
-        json_results = dh.results_jsonified(results, first_stamp, results_col="num_top_user_appears")
+        with dh.profile_stage(chat.profiler, "algo3_0.run", rows=len(big_df)):
+            if id_words is None:
+                id_words = chat_id_words(chat)
+            results, first_stamp = thalamus(
+                big_df,
+                min_=min_,
+                min_words=min_words,
+                goal="num_top_user_appears",
+                bounds=chat.get_bounds(min_),
+                top_n=top_n,
+                profiler=chat.profiler,
+                id_words=id_words,
+            )
+            results = results.head(limit)
+
+            # results_jsonified sorts by top calc
+            with dh.profile_stage(chat.profiler, "algo3_0.results_jsonified", rows=len(results)):
+                json_results = dh.results_jsonified(
+                    results, first_stamp, results_col="num_top_user_appears", keep_score=scores
+                )
         if save_json:
-            dh.save_json(json_results, f"algo3.0_top_user_appears")
+            dh.save_json(json_results, "algo3.0_top_user_appears")
 
-        return json_results
+        return dh.profiled_results(json_results, profile, chat.profiler)
     else:
-        return big_df # this is an empty numpy array if it is not a DF.
+        return dh.profiled_results(big_df, profile, chat.profiler) # this is an empty numpy array if it is not a DF.
+
+
+def sweep(data, mins=[1, 2, 3, 5, 10], limit=10, profile=None, frame_cache=None, **kwargs):
+    """
+    Runs algo3_0 for every `min_` in mins in one call. The chat is organized and the
+    words of each user (`id_words_counter`) are counted once for every run, only the
+    chunks and the participation of each `min_` are new.
+
+    ### Input
+    ------
+    ```
+    data: list, pd.DataFrame, Arrow table or data_handler.chatFrame
+        List of dictionaries of data from Twitch chat, or the same already organized
+        with `data_handler.chatFrame(data)`, or as a df/Arrow table (see `data_handler.ORGANIZED_SCHEMA`)
+    mins: list
+        Every `min_` to run
+    limit: int
+        Number of rows/dictionaries/timestamps to return for each `min_`
+    profile: bool, function, data_handler.stageProfiler or None
+        Records the stages of every run in one profiler, see `data_handler.stageProfiler`.
+        If True, returns (sweep_results, stages) instead of sweep_results.
+    frame_cache: str or None
+        Folder of organized chats, only used when data is a path or open file, see `data_handler.chatFrame`
+    kwargs:
+        Passed to `run`, ex: min_words=...
+    ```
+
+    ### Output
+    ------
+    ```
+    sweep_results: dict
+        min_:json_results of `run`
+    ```
+    """
+    chat = dh.get_chat(data, profile, frame_cache)
+    id_words = None if chat.empty else chat_id_words(chat)
+    sweep_results = {
+        min_: run(chat, min_=min_, limit=limit, id_words=id_words, **kwargs) for min_ in mins
+    }
+    return dh.profiled_results(sweep_results, profile, chat.profiler)
+
+
+def chat_id_words(chat):
+    """
+    `id_words_counter` of a `data_handler.chatFrame`, from its featureStore
+    """
+    features = chat.get_features()
+    with dh.profile_stage(chat.profiler, "algo3_0.id_words_counter", rows=len(chat.big_df)):
+        return id_words_counter(chat.big_df, features)
@@ -5,16 +5,17 @@ isolates to each `min_` timestamp, and sorts the resulting df by largest number
 HOW TO
 ```
 algo3_5.run(data, min_=2, limit=10, goal='num_words_emo', save_json = False)
+algo3_5.sweep(data, mins=[1, 2, 3, 5, 10], limit=10)
 ```
 """
 import pandas as pd
 from .helpers import data_handler as d
 
 
-def thalamus(big_df, min_, goal="num_words"):
+def thalamus(big_df, min_, goal="num_words", bounds=None, features=None):
     """
-    Calculates num_words/emoji/both then runs through functions to
-    split big_df, format for saving, and save as json
+    Sums num_words/emoji/both of every chunk from the prefix sums of a
+    `data_handler.featureStore`, then sorts the chunks by it
 
     ### Input
     -----
@@ -25,115 +26,54 @@ def thalamus(big_df, min_, goal="num_words"):
         number of minutes each chunk should be
     goal: str
         one of `num_words`, `num_emo`, or `num_words_emo`
+    bounds: tuple or None
+        Output of `data_handler.chunk_bounds` for big_df, found here if not given
+    features: data_handler.featureStore or None
+        Features of big_df, found here if not given
     ```
     """
-    # cut
-    big_df = algorithm(big_df)
-    first_stamp, chunk_list = d.get_chunks(big_df, min_=min_)
-    chunk_df = pd.DataFrame(columns=chunk_list[0].columns)
-    for chunk in chunk_list:
-        chunk_df = chunk_df.append(chunk)
-
-    results = results_formatter(chunk_df, goal=goal) # sorted by top goal
-    return results, first_stamp
-
-
-def algorithm(big_df):
-    # find number of words+emojis
-    big_df = num_words_in_chat(big_df)
-    if 'emoticons' in big_df.columns:
-        
-        # find number of emojis
-        big_df["num_emo"] = big_df["emoticons"].apply(
-            lambda x: len(x) if type(x) == list else 0
-        )
-
-    else: 
-        big_df["num_emo"] = 0
-    # find number of words only
-    big_df["num_words"] = big_df["num_words_emo"] - big_df["num_emo"]
-    return big_df
-
-
-
-def results_formatter(dataframe, goal):
-    """
-    Creates a new df `results` that contains the total number of words in the dataframe, the time
-    the time the dataframe started and ended.
-
-
-    ### Input
-    -----
-    ```
-    dataframe: pd.DataFrame
-        Dataframe with all the hours and chunks labeled, and num_words calculated
-    goal: str
-        Col name that has calculated results (ex: num_words, chat_rate, etc.)
-    ```
-    ### Output
-    ------
-    ```
-    results: pd.DataFrame
-        Dataframe with `hour`, `chunk`, `start`, `end`, `num_words` columns
-    ```
-    """
-    hour_list = []
-    chunk_list = []
-    time_start_list = []
-    time_end_list = []
-    goal_list = []
-
-    dataframe = dataframe.sort_values("created_at")
-    # label each chunk with unique ID
-    dataframe["category"] = dataframe["hour"].astype(str) + dataframe["chunk"].astype(
-        str
-    )
-
-    for cat in dataframe["category"].unique():
-        temp_df = dataframe[dataframe["category"] == cat]
-        hour_list.append(temp_df.iloc[0, -3])  # assumes hour col is 3 from end
-        chunk_list.append(temp_df.iloc[0, -2])  # assumes hunk col is 2 from end
-        time_start_list.append(temp_df.iloc[0, 0])  # assume created_at col is first
-        time_end_list.append(temp_df.iloc[-1, 0])  # assume created_at col is first
-        goal_list.append(temp_df[goal].sum())
+    if bounds is None:
+        big_df = big_df.sort_values("created_at", kind="mergesort")
+        bounds = d.chunk_bounds(big_df, min_=min_)
+    if features is None:
+        features = d.featureStore(big_df)
+    first_stamp, hour_bounds, chunk_bounds = bounds
+    stamps = big_df["created_at"].values
 
     results = pd.DataFrame(
         {
-            "hour": hour_list,
-            "chunk": chunk_list,
-            "start": time_start_list,
-            "end": time_end_list,
-            goal: goal_list,
+            "hour": chunk_bounds[:, 0],
+            "chunk": chunk_bounds[:, 1],
+            "start": stamps[chunk_bounds[:, 2]],
+            "end": stamps[chunk_bounds[:, 3] - 1],
+            goal: features.sums(goal, chunk_bounds[:, 2], chunk_bounds[:, 3]),
         }
     )
-    results = results.reset_index(drop=True).sort_values(goal, ascending = False) 
-    
-    return results
-
-
-def num_words_in_chat(dataframe):
-    """
-    Creates a new col `num_words_emo` that contains the number of words in each message
-    """
-    word_bag = []
-    body_split = dataframe["body"].str.split(" ")  # split each string at the whitespace
-    for row in body_split:
-        num_words = len(row)
-        word_bag.append(num_words)
-
-    dataframe["num_words_emo"] = word_bag
-    return dataframe
+    results = results.sort_values(goal, ascending=False) # sorted by top goal
+    return results, first_stamp
 
 
-def run(data, min_=2, limit=10, goal="num_words_emo", save_json=False):
+def run(
+    data,
+    min_=2,
+    limit=10,
+    goal="num_words_emo",
+    save_json=False,
+    scores=False,
+    step=None,
+    profile=None,
+    cache=None,
+    frame_cache=None,
+):
     """
     Runs algo3_5 to sort timestamps by the number of words+emojis by default.
 
     ### Input
     ------
     ```
-    data: list
-        List of dictionaries of data from Twitch chat
+    data: list, pd.DataFrame, Arrow table or data_handler.chatFrame
+        List of dictionaries of data from Twitch chat, or the same already organized
+        with `data_handler.chatFrame(data)`, or as a df/Arrow table (see `data_handler.ORGANIZED_SCHEMA`)
     min_: int
         Approximate number of minutes each clip should be
     limit: int
@@ -144,6 +84,19 @@ def run(data, min_=2, limit=10, goal="num_words_emo", save_json=False):
         'num_words_emo': sum of the number of words + emoticons in each chat message
     save_json: bool
         True if want to save results as json to exports folder
+    scores: bool
+        True to add each clip's `goal` to its dictionary as `score`
+    step: float or None
+        Seconds between the starts of overlapping `min_` windows, see `data_handler.sliding_bounds`.
+        If None, back to back chunks from `data_handler.chunk_bounds`.
+    profile: bool, function, data_handler.stageProfiler or None
+        Records the time, rows and (optionally) memory of each stage, see `data_handler.stageProfiler`.
+        If True, returns (json_results, stages) instead of json_results.
+    cache: data_handler.resultCache or None
+        Returns the result of an earlier run with the same chat and params from the cache,
+        see `data_handler.resultCache`. Not used when profiling.
+    frame_cache: str or None
+        Folder of organized chats, only used when data is a path or open file, see `data_handler.chatFrame`
     ```
 
     ### Output
@@ -154,17 +107,76 @@ def run(data, min_=2, limit=10, goal="num_words_emo", save_json=False):
             Ex: [{start:TIMESTAMP_INT, end:TIMESTAMP_INT}]
     ```
     """
-    data = pd.DataFrame.from_records(data)
-    big_df = d.organize_twitch_chat(data)  # fetch appropriate data
+    if cache is not None and profile is None:
+        json_results = cache.run(
+            run,
+            data,
+            min_=min_,
+            limit=limit,
+            goal=goal,
+            scores=scores,
+            step=step,
+            frame_cache=frame_cache,
+            unkeyed=("frame_cache",),  # only where the chat is loaded from
+        )
+        # saved here, a result found in the cache never reaches the save_json below
+        if save_json and type(json_results) == list:
+            d.save_json(json_results, f"algo3.5_{goal}")
+        return json_results
+    chat = d.get_chat(data, profile, frame_cache)
+    big_df = chat.big_df  # fetch appropriate data
     if type(big_df) == pd.DataFrame:
-        results, first_stamp = thalamus(big_df, min_, goal=goal)
-        results = results.head(limit)
-        
-        # results_jsonified sorts by top calc
-        json_results = d.results_jsonified(results, first_stamp, goal)
+        with d.profile_stage(chat.profiler, "algo3_5.run", rows=len(big_df)):
+            bounds = chat.get_bounds(min_, step=step)
+            features = chat.get_features()
+            with d.profile_stage(chat.profiler, "algo3_5.thalamus", rows=len(bounds[2])):
+                results, first_stamp = thalamus(
+                    big_df, min_, goal=goal, bounds=bounds, features=features
+                )
+            results = results.head(limit)
+
+            # results_jsonified sorts by top calc
+            with d.profile_stage(chat.profiler, "algo3_5.results_jsonified", rows=len(results)):
+                json_results = d.results_jsonified(results, first_stamp, goal, keep_score=scores)
         if save_json:
             d.save_json(json_results, f"algo3.5_{goal}")
 
-        return json_results
+        return d.profiled_results(json_results, profile, chat.profiler)
     else:
-        return big_df # this is an empty numpy array if it is not a DF.
\ No newline at end of file
+        return d.profiled_results(big_df, profile, chat.profiler) # this is an empty numpy array if it is not a DF.
+
+
+def sweep(data, mins=[1, 2, 3, 5, 10], limit=10, profile=None, frame_cache=None, **kwargs):
+    """
+    Runs algo3_5 for every `min_` in mins in one call. The chat is organized once and
+    shared by every run, only the chunks of each `min_` are new.
+
+    ### Input
+    ------
+    ```
+    data: list, pd.DataFrame, Arrow table or data_handler.chatFrame
+        List of dictionaries of data from Twitch chat, or the same already organized
+        with `data_handler.chatFrame(data)`, or as a df/Arrow table (see `data_handler.ORGANIZED_SCHEMA`)
+    mins: list
+        Every `min_` to run
+    limit: int
+        Number of rows/dictionaries/timestamps to return for each `min_`
+    profile: bool, function, data_handler.stageProfiler or None
+        Records the stages of every run in one profiler, see `data_handler.stageProfiler`.
+        If True, returns (sweep_results, stages) instead of sweep_results.
+    frame_cache: str or None
+        Folder of organized chats, only used when data is a path or open file, see `data_handler.chatFrame`
+    kwargs:
+        Passed to `run`, ex: goal=...
+    ```
+
+    ### Output
+    ------
+    ```
+    sweep_results: dict
+        min_:json_results of `run`
+    ```
+    """
+    chat = d.get_chat(data, profile, frame_cache)
+    sweep_results = {min_: run(chat, min_=min_, limit=limit, **kwargs) for min_ in mins}
+    return d.profiled_results(sweep_results, profile, chat.profiler)
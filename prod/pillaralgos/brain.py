@@ -1,26 +1,71 @@
 '''
 Coordinates all 4 algorithms, then compares across results to see if any timestamps are shared between them
 '''
-import pandas as pd
 from pillaralgos import algo1, algo2, algo3_0, algo3_5
+from pillaralgos.helpers import data_handler as dh
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import json
 import numpy as np
 
-def run(data, clip_length, common_timestamps=2, algos_to_compare = ["algo1","algo2","algo3_0","algo3_5"], limit=None):
+ALGOS = {"algo1": algo1, "algo2": algo2, "algo3_0": algo3_0, "algo3_5": algo3_5}
+worker_chat = None  # chatFrame of this worker process, see `set_worker_chat`
+
+
+def run(
+    data,
+    clip_length,
+    common_timestamps=2,
+    algos_to_compare=["algo1", "algo2", "algo3_0", "algo3_5"],
+    limit=None,
+    executor="serial",
+    workers=None,
+    mode="exact",
+    min_overlap=0,
+    candidates=10,
+    fusion="rrf",
+    profile=None,
+    cache=None,
+    frame_cache=None,
+):
     '''
     Coordinates all 4 algorithms, then compares across results to see if any timestamps are shared between them. Runs all algos on default param settings.
     
     ### Input
     -----
     ```
-    data: list
-        List of dictionaries, like a json file in the format [{'startTime':float, 'endTime':float}]
+    data: list, pd.DataFrame, Arrow table or data_handler.chatFrame
+        List of dictionaries of data from Twitch chat, or the same already organized as a
+        df/Arrow table (see `data_handler.ORGANIZED_SCHEMA`). Organized once into a
+        `data_handler.chatFrame` that is shared by every algo.
     common_timestamps: int
         Cutoff for how many algos should have a timestamp for it to be included in the results
     algos_to_compare: list
         List of one of: "algo1","algo2","algo3_0","algo3_5"
     limit: int or None
         How many results should be returned. If None, all results surviving the X filter will be returned.
+    executor: str
+        How to run the algos, see `run_algos`. One of "serial", "threads", "processes"
+    workers: int or None
+        Max number of threads/processes. If None, one per algo.
+    mode: str
+        "exact": keep clips whose startTime is returned by `common_timestamps` algos, see `consensus`
+        "overlap": keep the stretches where clips of `common_timestamps` algos overlap, see `overlap_consensus`
+        "fusion": combine every algo's ranking into one score per `clip_length` slot, see `fusion_consensus`
+    min_overlap: float
+        Only for mode="overlap". Minimum seconds the algos must overlap for a stretch to be kept
+    candidates: int or None
+        How many of each algo's best clips are compared (the `limit` of each algo). If None, every clip is compared.
+    fusion: str
+        Only for mode="fusion". "rrf" for reciprocal rank fusion, "score" for the sum of min-max normalized scores
+    profile: bool, function, data_handler.stageProfiler or None
+        Records the time, rows and (optionally) memory of ingest, each algo's stages and the comparison,
+        see `data_handler.stageProfiler`. If True, returns (new_json, stages) instead of new_json.
+        With executor="processes" the stages inside each algo are not recorded.
+    cache: data_handler.resultCache or None
+        Returns the result of an earlier run with the same chat and params from the cache,
+        see `data_handler.resultCache`. Not used when profiling.
+    frame_cache: str or None
+        Folder of organized chats, only used when data is a path or open file, see `data_handler.chatFrame`
     ```
 
     ### Output
@@ -33,48 +78,317 @@ def run(data, clip_length, common_timestamps=2, algos_to_compare = ["algo1","alg
     '''
     if len(algos_to_compare) < 1:
         return "algos_to_compare cannot be empty"
-    # comply with user input
-    compare_us = []
-    if "algo1" in algos_to_compare:
-        compare_us.append(algo1)
-    if "algo2" in algos_to_compare:
-        compare_us.append(algo2)
-    if "algo3_0" in algos_to_compare:
-        compare_us.append(algo3_0)
-    if "algo3_5" in algos_to_compare:
-        compare_us.append(algo3_5)
-    results = []
+    # before the chat is hashed or scored
+    if mode not in ("exact", "overlap", "fusion"):
+        raise ValueError('mode must be one of "exact", "overlap", "fusion"')
+    if mode == "fusion" and fusion not in ("rrf", "score"):
+        raise ValueError('fusion must be one of "rrf", "score"')
+    # comply with user input, keeping the algo1 -> algo3_5 order
+    compare_us = [name for name in ALGOS.keys() if name in algos_to_compare]
+    if cache is not None and profile is None:
+        return cache.run(
+            run,
+            data,
+            clip_length=clip_length,
+            common_timestamps=common_timestamps,
+            algos_to_compare=compare_us,
+            limit=limit,
+            executor=executor,
+            workers=workers,
+            mode=mode,
+            min_overlap=min_overlap,
+            candidates=candidates,
+            fusion=fusion,
+            frame_cache=frame_cache,
+            unkeyed=("executor", "workers", "frame_cache"),  # same result however it is run
+        )
+    # parse once, every algo reuses the same organized df and chunk bounds
+    chat = dh.get_chat(data, profile, frame_cache)
     # gather results from algos
-    for algo in compare_us:
-        result = algo.run(data, min_=clip_length)
-        results.append(result)
+    with dh.profile_stage(chat.profiler, "brain.run_algos", rows=len(chat.timestamps)):
+        results = run_algos(
+            chat,
+            compare_us,
+            min_=clip_length,
+            executor=executor,
+            workers=workers,
+            limit=candidates,
+            scores=(mode == "fusion"),
+        )
 
-    # turn results into df
-    results_df = pd.DataFrame(columns=['startTime','endTime'])
-    for i in range(len(results)):
-        result = results[i]
-        result = pd.DataFrame(result)
-        results_df = results_df.append(result)
+    num_clips = sum(len(result) for result in results)
+    with dh.profile_stage(chat.profiler, f"brain.{mode}_consensus", rows=num_clips):
+        if mode == "exact":
+            new_json = consensus(results, common_timestamps)
+        elif mode == "overlap":
+            new_json = overlap_consensus(results, common_timestamps, min_overlap=min_overlap)
+        else:
+            new_json = fusion_consensus(results, grid=clip_length * 60, method=fusion, top_k=limit)
 
-    # get valuecounts as a list, filter out timestamps that only occur once
-    common = list(results_df['startTime'].value_counts()[results_df['startTime'].value_counts(sort=True) >= common_timestamps].index)
+    if limit:
+        new_json = new_json[:limit]
+    return dh.profiled_results(new_json, profile, chat.profiler)
 
-    common_results = pd.DataFrame(columns=['startTime','endTime'])
 
-    for i, row in results_df.iterrows():
-        if row['startTime'] in common:
-            common_results = common_results.append(row)
+def consensus(results, common_timestamps=2):
+    '''
+    Finds the clips whose startTime was returned at least `common_timestamps` times across all algo results.
+    Counts every startTime in one go instead of checking clip by clip.
 
-    if len(common_results) < 1:
-        return np.array()
-    
-    common_results = common_results.drop_duplicates()
-    
-    new_json = []
-    for i, row in common_results.iterrows():
-        new_json.append({'startTime':row['startTime'], 'endTime':row['endTime']})
-        
-    if limit:
-        return new_json[:limit]
+    ### Input
+    -----
+    ```
+    results: list
+        Output of each algo's `run`, list of lists of {'startTime','endTime'} dicts
+    common_timestamps: int
+        Minimum number of times a startTime must be returned to be kept
+    ```
+
+    ### Output
+    ------
+    ```
+    new_json: list
+        {'startTime','endTime'} dicts in the order the algos returned them, without duplicates.
+        Empty list if no startTime is common enough.
+    ```
+    '''
+    clips = [clip for result in results for clip in result]
+    if len(clips) < 1:
+        return []
+    starts = np.array([clip["startTime"] for clip in clips], dtype=float)
+    ends = np.array([clip["endTime"] for clip in clips], dtype=float)
+
+    # how many times each startTime shows up, broadcast back to every clip
+    unique_starts, inverse, counts = np.unique(starts, return_inverse=True, return_counts=True)
+    keep = np.nonzero(counts[inverse] >= common_timestamps)[0]
+
+    # drop repeated (startTime, endTime) pairs, keeping the first one returned
+    pairs = np.stack([starts[keep], ends[keep]], axis=1)
+    first_seen = np.sort(np.unique(pairs, axis=0, return_index=True)[1])
+    keep = keep[first_seen]
+
+    new_json = [
+        {"startTime": start, "endTime": end}
+        for start, end in zip(starts[keep].tolist(), ends[keep].tolist())
+    ]
+    return new_json
+
+
+def overlap_consensus(results, common_timestamps=2, min_overlap=0):
+    '''
+    Finds the stretches of the stream covered by clips of at least `common_timestamps` different algos,
+    even when their startTimes don't match exactly. One sweep over the sorted clip edges, so
+    it stays O(n log n) for full length result lists.
+
+    ### Input
+    -----
+    ```
+    results: list
+        Output of each algo's `run`, list of lists of {'startTime','endTime'} dicts
+    common_timestamps: int
+        Minimum number of algos that must cover a stretch for it to be kept
+    min_overlap: float
+        Minimum length in seconds of a kept stretch
+    ```
+
+    ### Output
+    ------
+    ```
+    new_json: list
+        Merged {'startTime','endTime'} dicts, stretches covered by the most algos first
+        (ties in order of startTime). Empty list if no stretch qualifies.
+    ```
+    '''
+    starts = []
+    ends = []
+    for result in results:
+        if len(result) < 1:
+            continue
+        algo_starts = np.array([clip["startTime"] for clip in result], dtype=float)
+        algo_ends = np.array([clip["endTime"] for clip in result], dtype=float)
+        # merge overlapping clips of the same algo so each algo counts once
+        order = np.argsort(algo_starts, kind="mergesort")
+        algo_starts, algo_ends = algo_starts[order], algo_ends[order]
+        reach = np.maximum.accumulate(algo_ends)
+        new_group = np.ones(len(order), dtype=bool)
+        new_group[1:] = algo_starts[1:] > reach[:-1]
+        starts.append(algo_starts[new_group])
+        ends.append(np.maximum.reduceat(algo_ends, np.nonzero(new_group)[0]))
+    if len(starts) < 1:
+        return []
+    starts = np.concatenate(starts)
+    ends = np.concatenate(ends)
+
+    # sweep line: +1 when a clip starts, -1 when it ends, ends first on ties
+    times = np.concatenate([starts, ends])
+    steps = np.concatenate([np.ones(len(starts), dtype=int), -np.ones(len(ends), dtype=int)])
+    order = np.lexsort((steps, times))
+    times, steps = times[order], steps[order]
+    depth = np.cumsum(steps)  # number of algos covering times[i] -> times[i+1]
+
+    seg_start, seg_end, seg_depth = times[:-1], times[1:], depth[:-1]
+    covered = (seg_depth >= common_timestamps) & (seg_end > seg_start)
+    seg_start, seg_end, seg_depth = seg_start[covered], seg_end[covered], seg_depth[covered]
+    if len(seg_start) < 1:
+        return []
+
+    # glue back to back segments into one stretch
+    new_stretch = np.ones(len(seg_start), dtype=bool)
+    new_stretch[1:] = seg_start[1:] != seg_end[:-1]
+    firsts = np.nonzero(new_stretch)[0]
+    lasts = np.append(firsts[1:], len(seg_start)) - 1
+    stretch_start, stretch_end = seg_start[firsts], seg_end[lasts]
+    stretch_depth = np.maximum.reduceat(seg_depth, firsts)
+
+    long_enough = (stretch_end - stretch_start) >= min_overlap
+    stretch_start, stretch_end = stretch_start[long_enough], stretch_end[long_enough]
+    stretch_depth = stretch_depth[long_enough]
+    order = np.argsort(-stretch_depth, kind="mergesort")
+
+    new_json = [
+        {"startTime": start, "endTime": end}
+        for start, end in zip(stretch_start[order].tolist(), stretch_end[order].tolist())
+    ]
+    return new_json
+
+
+def fusion_consensus(results, grid, method="rrf", rrf_k=60, top_k=None):
+    '''
+    Scores every `grid` second slot of the stream by how well each algo ranked the clips covering it,
+    then returns the best slots. A clip adds its rank (or score) to each slot it covers, weighted by how
+    much of the slot it covers. Only the top_k slots are sorted.
+
+    ### Input
+    -----
+    ```
+    results: list
+        Output of each algo's `run` with scores=True, best clip first
+    grid: float
+        Length of each slot in seconds
+    method: str
+        "rrf": reciprocal rank fusion, a clip ranked r (from 1) adds 1/(rrf_k + r)
+        "score": a clip adds its `score` min-max normalized within its algo, so every algo weighs 0 to 1
+    rrf_k: int
+        Damping for "rrf", bigger values flatten the difference between top and bottom ranks
+    top_k: int or None
+        How many slots to return. If None, every slot with a fused score above 0.
+    ```
+
+    ### Output
+    ------
+    ```
+    new_json: list
+        {'startTime','endTime'} dicts of the best slots, highest fused score first
+    ```
+    '''
+    fused = np.zeros(0)
+    for result in results:
+        if len(result) < 1:
+            continue
+        starts = np.array([clip["startTime"] for clip in result], dtype=float)
+        ends = np.array([clip["endTime"] for clip in result], dtype=float)
+        if method == "rrf":
+            points = 1 / (rrf_k + np.arange(1, len(result) + 1))
+        elif method == "score":
+            scores = np.array([clip["score"] for clip in result], dtype=float)
+            spread = scores.max() - scores.min()
+            points = (scores - scores.min()) / spread if spread > 0 else np.ones(len(scores))
+        else:
+            raise ValueError('method must be one of "rrf", "score"')
+
+        # one row per (clip, slot) pair the clip touches
+        first_slot = np.floor(starts / grid).astype(int)
+        last_slot = np.maximum(np.ceil(ends / grid).astype(int) - 1, first_slot)
+        num_slots = last_slot - first_slot + 1
+        clip = np.repeat(np.arange(len(result)), num_slots)
+        first_row = np.cumsum(num_slots) - num_slots  # row of each clip's first slot
+        slot = first_slot[clip] + np.arange(len(clip)) - first_row[clip]
+        covered = np.minimum(ends[clip], (slot + 1) * grid) - np.maximum(starts[clip], slot * grid)
+        weight = np.where(ends[clip] > starts[clip], covered / grid, 1)
+
+        algo_fused = np.bincount(slot, weights=points[clip] * weight)
+        if len(algo_fused) > len(fused):
+            fused = np.pad(fused, (0, len(algo_fused) - len(fused)))
+        fused[: len(algo_fused)] += algo_fused
+
+    slots = np.nonzero(fused > 0)[0]
+    if top_k and top_k < len(slots):
+        slots = slots[np.argpartition(-fused[slots], top_k - 1)[:top_k]]
+        slots = np.sort(slots)  # so equal scores keep time order below
+    slots = slots[np.argsort(-fused[slots], kind="mergesort")]
+
+    new_json = [
+        {"startTime": float(slot * grid), "endTime": float((slot + 1) * grid)}
+        for slot in slots.tolist()
+    ]
+    return new_json
+
+
+def run_algos(chat, algo_names, min_, executor="serial", workers=None, **kwargs):
+    '''
+    Runs each algo on the same chatFrame with its default params. The algos don't
+    depend on each other, so they can run at the same time.
+
+    ### Input
+    -----
+    ```
+    chat: data_handler.chatFrame
+        Organized twitch chat
+    algo_names: list
+        List of one of: "algo1","algo2","algo3_0","algo3_5"
+    min_: int
+        Approximate number of minutes each clip should be
+    executor: str
+        "serial": one algo after another
+        "threads": each algo in a thread, all sharing `chat`
+        "processes": each algo in a process. `chat` is sent to each worker process
+            once when it starts, not once per algo.
+    workers: int or None
+        Max number of threads/processes. If None, one per algo.
+    kwargs:
+        Passed to every algo's `run`, ex: limit=None, scores=True
+    ```
+
+    ### Output
+    ------
+    ```
+    results: list
+        Output of each algo's `run`, in the same order as algo_names
+    ```
+    '''
+    if not chat.empty:
+        # find once, before the chatFrame is shared
+        chat.get_bounds(min_)
+        chat.get_features()
+    if executor == "serial":
+        return [ALGOS[name].run(chat, min_=min_, **kwargs) for name in algo_names]
+
+    workers = workers or len(algo_names)
+    if executor == "threads":
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(ALGOS[name].run, chat, min_=min_, **kwargs) for name in algo_names]
+            results = [future.result() for future in futures]
+    elif executor == "processes":
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=set_worker_chat, initargs=(chat,)
+        ) as pool:
+            futures = [pool.submit(run_worker_algo, name, min_, **kwargs) for name in algo_names]
+            results = [future.result() for future in futures]
     else:
-        return new_json
+        raise ValueError('executor must be one of "serial", "threads", "processes"')
+    return results
+
+
+def set_worker_chat(chat):
+    '''
+    Runs once when each worker process starts, stores its copy of the chatFrame
+    '''
+    global worker_chat
+    worker_chat = chat
+
+
+def run_worker_algo(name, min_, **kwargs):
+    '''
+    Runs one algo on the chatFrame of this worker process
+    '''
+    return ALGOS[name].run(worker_chat, min_=min_, **kwargs)
@@ -5,6 +5,17 @@ also json_saver() that converts given variable into string, saves into .json fil
 import pandas as pd
 import numpy as np
 import datetime as dt
+from collections import OrderedDict
+import array
+import codecs
+import contextlib
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
 
 # remove the .loc warning. bc I dont acre about writes making it back
 # to og dataframe https://stackoverflow.com/a/20627316/9866659
@@ -24,9 +35,9 @@ def rename_columns(col_string):
         return col_string.replace("_mess", "", 1).replace("_id", "", 1)
 
 
-def select_columns(dataframe, keep_user_vars=False):
+def unused_columns(keep_user_vars=False):
     """
-    Removes unneeded columns
+    Returns the (suffixed) columns that `select_columns` removes
     """
     if keep_user_vars:
         # If true, include user columns
@@ -43,6 +54,14 @@ def select_columns(dataframe, keep_user_vars=False):
             "updated_at_id",
             "logo_id",
         ]
+    return bad_cols
+
+
+def select_columns(dataframe, keep_user_vars=False):
+    """
+    Removes unneeded columns
+    """
+    bad_cols = unused_columns(keep_user_vars)
     dataframe = dataframe.drop(bad_cols, axis=1)
     cols = dataframe.columns
     cols = list(pd.Series(cols).apply(rename_columns))
@@ -50,14 +69,97 @@ def select_columns(dataframe, keep_user_vars=False):
     return dataframe
 
 
-def organize_twitch_chat(data, keep_user_vars=False):
+ORGANIZED_SCHEMA = {
+    "created_at": "datetime64[ns], or anything pd.to_datetime reads. tz-aware is converted to UTC",
+    "_id": "int, the commenter's id",
+    "body": "str, the message. Or a num_words_emo int col with its number of words + emoticons",
+    "emoticons": "optional, list of {_id, begin, end} dicts or NaN. Or a num_emo int col",
+    "*": "optional, any other col of `organize_twitch_chat`, kept as is",
+}
+
+
+def is_organized(data):
+    """
+    True if data is a df (or Arrow table) that is already organized, see `ORGANIZED_SCHEMA`,
+    and not the raw messages with `commenter` and `message` columns
+    """
+    if is_arrow(data):
+        columns = data.schema.names
+    elif isinstance(data, pd.DataFrame):
+        columns = data.columns
+    else:
+        return False
+    return "_id" in columns and "created_at" in columns and "commenter" not in columns
+
+
+def is_arrow(data):
+    """
+    True if data is a pyarrow Table or RecordBatch, without importing pyarrow
+    """
+    return hasattr(data, "schema") and hasattr(data, "to_pandas") and not isinstance(data, pd.DataFrame)
+
+
+def organized_frame(data):
+    """
+    Checks an already organized df (or Arrow table) against `ORGANIZED_SCHEMA`. Only looks
+    at column names and dtypes, so it's instant. Columns with the wrong dtype are converted,
+    if every column is fine the df itself is returned, not a copy.
+
+    input
+    -----
+    data: pd.DataFrame or Arrow table
+        Organized twitch chat, ex: the output of `organize_twitch_chat`
+
+    output
+    ------
+    big_df: pd.DataFrame
+        data with `created_at` as datetime64[ns] and `_id` as int. Empty np.array if no rows.
+    """
+    if is_arrow(data):
+        data = data.to_pandas()
+    missing = [col for col in ["created_at", "_id"] if col not in data.columns]
+    if "body" not in data.columns and "num_words_emo" not in data.columns:
+        missing.append("body")
+    if missing:
+        raise ValueError(f"organized chat is missing {missing}, see data_handler.ORGANIZED_SCHEMA")
+    if len(data) == 0:
+        return np.array([])
+
+    fixes = {}
+    created_at = data["created_at"]
+    if isinstance(created_at.dtype, pd.DatetimeTZDtype):
+        fixes["created_at"] = created_at.dt.tz_convert("UTC").dt.tz_localize(None)
+    elif pd.api.types.is_datetime64_dtype(created_at.dtype):
+        if created_at.dtype != "datetime64[ns]":
+            fixes["created_at"] = created_at.astype("datetime64[ns]")
+    else:  # twitch strings, "...Z" ones would be tz aware with pd.to_datetime
+        fixes["created_at"] = parse_timestamps(created_at.values)
+    if not pd.api.types.is_integer_dtype(data["_id"].dtype):
+        fixes["_id"] = data["_id"].astype(np.int64)
+    if fixes:
+        data = data.assign(**fixes)
+    return data
+
+
+def organize_twitch_chat(data, keep_user_vars=False, columnar=True, columns=None):
     """
     Turns json into dataframe. Expands lists of lists into own columns.
+    An already organized df or Arrow table is only checked, see `organized_frame`.
 
     input
     -----
-    data: list
+    data: list, pd.DataFrame or Arrow table
         list of dictionaries in json format, loaded with the `open` context manager.
+        Or the same already organized, see `ORGANIZED_SCHEMA`.
+    keep_user_vars: bool
+        True to keep the commenter's bio, logo, created_at and updated_at columns
+    columnar: bool
+        True to flatten the `commenter` and `message` dicts column by column with
+        `columnExtractor`. False to use the older row by row `dictExtractor`.
+        Both return the same dataframe.
+    columns: list or None
+        Only for a list of dictionaries. Columns to keep, ex: ["created_at", "_id", "body"].
+        The others are never cast, so their timestamps aren't parsed. None to keep every column.
 
     output
     ------
@@ -66,7 +168,13 @@ def organize_twitch_chat(data, keep_user_vars=False):
             ['created_at', 'updated_at', 'display_name', '_id', 'name', 'type',
              'bio', 'logo', 'body', 'is_action', 'user_badges', 'emoticons']
     """
+    if is_organized(data):
+        return organized_frame(data)
     if len(data) > 0:
+        if columnar:
+            df = columnar_organizer(data, keep_user_vars, columns)
+            return df
+
         data = pd.DataFrame.from_records(data)  # convert to df
         df = data[["created_at", "updated_at", "commenter", "message"]].add_suffix("_mess")
 
@@ -77,25 +185,204 @@ def organize_twitch_chat(data, keep_user_vars=False):
 
         df = df.drop(["message_mess", "commenter_mess"], axis=1)  # duplicate info
         df = pd.concat([df, users, messages], axis=1)
-        # all vars were loaded as str. Change type to datetime/int/bool
-        df = df.astype(
-            {
-                "_id_id": int,
-                "bio_id": "category",
-                "created_at_id": "datetime64[ns]",
-                "created_at_mess": "datetime64[ns]",
-                "updated_at_id": "datetime64[ns]",
-                "updated_at_mess": "datetime64[ns]",
-                "is_action_mess": bool,
-                "type_id": "category",
-            }
-        )
+        # all vars were loaded as str. Change type to datetime/int/bool, skipping
+        # the cols select_columns drops anyway (ex: the commenter's created_at)
+        skip = unused_columns(keep_user_vars)
+        if columns is not None:
+            skip = skip + [col for col in df.columns if rename_columns(col) not in columns]
+        df = cast_columns(df, skip=skip)
         df = select_columns(df, keep_user_vars)
+        if columns is not None:
+            df = df[[col for col in df.columns if col in columns]]
         return df
     else:
         return np.array([])
 
 
+def column_dtypes(columns):
+    """
+    Returns the dtypes to cast the raw (suffixed) twitch columns to, limited to
+    the given columns
+    """
+    dtypes = {
+        "_id_id": int,
+        "bio_id": "category",
+        "created_at_id": "datetime64[ns]",
+        "created_at_mess": "datetime64[ns]",
+        "updated_at_id": "datetime64[ns]",
+        "updated_at_mess": "datetime64[ns]",
+        "is_action_mess": bool,
+        "type_id": "category",
+    }
+    return {col: dtype for col, dtype in dtypes.items() if col in columns}
+
+
+def parse_timestamps(values):
+    """
+    Fast parse of twitch timestamps, "YYYY-MM-DDTHH:MM:SS.fffZ" with 0 to 9 digits of
+    fractions of a second. Reads the digits at their fixed places for every string at once
+    as a (n, 32) array of bytes, instead of parsing string by string. Strings that don't
+    follow that layout exactly (or aren't strings, ex: NaN) go through `pd.to_datetime`
+    like before, so anything it can't read still raises.
+
+    input
+    -----
+    values: list or np.array
+        Timestamp strings
+
+    output
+    ------
+    stamps: np.array
+        datetime64[ns], UTC
+    """
+    values = np.asarray(values, dtype=object)
+    n = len(values)
+    try:
+        raw = values.astype("S32")  # too long strings are cut, caught by the last byte check
+    except (UnicodeEncodeError, ValueError):
+        raw = None
+    if raw is None or n == 0:
+        return fallback_timestamps(values)
+    b = raw.view(np.uint8).reshape(n, 32)
+
+    def number(start, stop, dtype):
+        # the digits at [start, stop) as a number, and whether they all are digits
+        num = np.zeros(n, dtype=dtype)
+        is_digit = np.ones(n, dtype=bool)
+        for i in range(start, stop):
+            digit = b[:, i] - np.uint8(ord("0"))  # not digits wrap above 9
+            is_digit &= digit <= 9
+            num = num * dtype(10) + digit
+        return num, is_digit
+
+    ok = (
+        (b[:, 4] == ord("-"))
+        & (b[:, 7] == ord("-"))
+        & (b[:, 10] == ord("T"))
+        & (b[:, 13] == ord(":"))
+        & (b[:, 16] == ord(":"))
+        & (b[:, 31] == 0)
+    )
+    # smallest dtypes that fit, most of the time goes to reading/writing the arrays
+    fields = []
+    for start, stop, dtype in [
+        (0, 4, np.int16),
+        (5, 7, np.uint8),
+        (8, 10, np.uint8),
+        (11, 13, np.uint8),
+        (14, 16, np.uint8),
+        (17, 19, np.uint8),
+    ]:
+        num, is_digit = number(start, stop, dtype)
+        ok &= is_digit
+        fields.append(num)
+    year, month, day, hour, minute, second = fields
+
+    # fraction: "." then 1 to 9 digits, or nothing, then "Z" and the 0 padding
+    has_dot = b[:, 19] == ord(".")
+    num_digits = np.zeros(n, dtype=np.uint8)
+    frac = np.zeros(n, dtype=np.int32)  # ns once all 9 places are read
+    still_digits = has_dot
+    for i in range(20, 29):
+        digit = b[:, i] - np.uint8(ord("0"))
+        still_digits = still_digits & (digit <= 9)
+        num_digits += still_digits
+        frac = frac * 10 + digit * still_digits
+    end = np.where(has_dot, num_digits + np.uint8(20), np.uint8(19))
+    rows = np.arange(n)
+    ok &= (b[rows, end] == ord("Z")) & (b[rows, end + 1] == 0)
+    ok &= ~has_dot | (num_digits > 0)
+
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_days = np.zeros(256, dtype=np.uint8)
+    month_days[1:13] = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+    ok &= (day >= 1) & (day <= month_days[month] + (leap & (month == 2)))
+    ok &= (hour < 24) & (minute < 60) & (second < 60)
+    ok &= (year > 1677) & (year < 2262)  # whole years in range of datetime64[ns]
+
+    # days since 1970-01-01 of each date, the usual civil calendar formula
+    y = year.astype(np.int64) - (month <= 2)
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    days = era * 146097 + yoe * 365 + yoe // 4 - yoe // 100 + doy - 719468
+    secs = hour.astype(np.int32) * 3600 + minute.astype(np.int16) * 60 + second
+    stamps = (days * 86400 + secs) * 10 ** 9 + frac
+    stamps = stamps.view("datetime64[ns]")
+
+    if not ok.all():
+        stamps[~ok] = fallback_timestamps(values[~ok])
+    return stamps
+
+
+def fallback_timestamps(values):
+    """
+    `pd.to_datetime` of values as naive UTC datetime64[ns], for `parse_timestamps`
+    """
+    stamps = pd.to_datetime(pd.Series(values, dtype=object), utc=True)
+    return stamps.dt.tz_localize(None).values
+
+
+def cast_columns(df, skip=()):
+    """
+    Casts the raw (suffixed) twitch str columns to their `column_dtypes`, timestamps with
+    `parse_timestamps`. Columns in skip are left as they are.
+    """
+    dtypes = {col: dtype for col, dtype in column_dtypes(df.columns).items() if col not in skip}
+    for col, dtype in dtypes.items():
+        if dtype == "datetime64[ns]":
+            df[col] = parse_timestamps(df[col].values)
+    df = df.astype({col: dtype for col, dtype in dtypes.items() if dtype != "datetime64[ns]"})
+    return df
+
+
+def records_column(data, col):
+    """
+    Returns one top level field of every chat message as a list
+
+    input
+    -----
+    data: list or pd.DataFrame
+        list of dictionaries in json format, or the same after `pd.DataFrame.from_records`
+    col: str
+        Top level key, ex: "created_at" or "message"
+    """
+    if isinstance(data, pd.DataFrame):
+        return data[col].tolist()
+    return [row[col] for row in data]
+
+
+def columnar_organizer(data, keep_user_vars=False, columns=None):
+    """
+    Columnar version of `organize_twitch_chat`. Flattens the `commenter` and
+    `message` dicts one column at a time, skipping the columns that
+    `select_columns` would drop anyway. If given, only `columns` are kept.
+
+    output
+    ------
+    df: pd.DataFrame
+        Same dataframe as `organize_twitch_chat(data, columnar=False)`
+    """
+    skip = unused_columns(keep_user_vars)
+    df = pd.DataFrame(
+        {
+            "created_at_mess": records_column(data, "created_at"),
+            "updated_at_mess": records_column(data, "updated_at"),
+        }
+    )
+    users = columnExtractor(records_column(data, "commenter"), label="_id", skip=skip)
+    messages = columnExtractor(records_column(data, "message"), label="_mess", skip=skip)
+
+    df = pd.concat([df, users.result, messages.result], axis=1)
+    if columns is not None:
+        # before casting, so ex: updated_at isn't parsed when only created_at is used
+        df = df[[col for col in df.columns if rename_columns(col) in columns]]
+    # all vars were loaded as str. Change type to datetime/int/bool
+    df = cast_columns(df)
+    df.columns = [rename_columns(col) for col in df.columns]
+    return df
+
+
 class dictExtractor:
     def __init__(self, my_series, label=""):
         """
@@ -143,6 +430,204 @@ class dictExtractor:
                 self.new_dict[k].append(my_dict[k])
 
 
+# fields that stream_twitch_chat can keep, as col:(dict the value is in, key in that dict)
+STREAM_FIELDS = {
+    "created_at": (None, "created_at"),
+    "updated_at": (None, "updated_at"),
+    "_id": ("commenter", "_id"),
+    "type": ("commenter", "type"),
+    "body": ("message", "body"),
+    "is_action": ("message", "is_action"),
+    "user_badges": ("message", "user_badges"),
+    "emoticons": ("message", "emoticons"),
+}
+
+
+def stream_twitch_chat(
+    file,
+    columns=["created_at", "updated_at", "_id", "body", "is_action", "emoticons"],
+    chunk_size=2 ** 16,
+):
+    """
+    Streaming version of `organize_twitch_chat` for very large chat logs. Reads the
+    json file one message at a time and writes only the needed fields into typed
+    column buffers, so the list of dictionaries is never built.
+
+    input
+    -----
+    file: str or file-like
+        Path to a twitch chat .json file, or an open text or binary file
+    columns: list
+        Columns to keep, any of the keys of `STREAM_FIELDS`
+    chunk_size: int
+        Number of characters read from the file at a time
+
+    output
+    ------
+    df: pd.DataFrame
+        Same values and dtypes as the matching `organize_twitch_chat` columns.
+        Empty np.array if the file has no messages.
+    """
+    if isinstance(file, str):
+        with open(file, "r", encoding="utf-8") as f:
+            return stream_twitch_chat(f, columns=columns, chunk_size=chunk_size)
+
+    buffers = {col: columnBuffer(col) for col in columns}
+    for message in json_array_iterator(file, chunk_size=chunk_size):
+        for col, buffer in buffers.items():
+            parent, key = STREAM_FIELDS[col]
+            record = message if parent is None else message[parent]
+            if key in record:
+                buffer.append(record[key])
+            else:
+                buffer.append_missing()
+
+    if len(buffers[columns[0]]) == 0:
+        return np.array([])
+    df = pd.DataFrame({col: buffer.result() for col, buffer in buffers.items() if buffer.seen})
+    return df
+
+
+class columnBuffer:
+    def __init__(self, col, batch_size=2 ** 16):
+        """
+        Collects the values of one column for `stream_twitch_chat`. Timestamps are
+        parsed `batch_size` at a time into int64 nanoseconds, ids are stored as
+        int64 and `is_action` as int8, everything else stays a python list.
+        """
+        self.col = col
+        self.batch_size = batch_size
+        self.seen = False  # like dictExtractor, cols nobody had are dropped
+        if col in ["created_at", "updated_at"]:
+            self.kind = "datetime"
+            self.values = array.array("q")
+            self.pending = []  # timestamp str not parsed yet
+        elif col == "_id":
+            self.kind = "int"
+            self.values = array.array("q")
+        elif col == "is_action":
+            self.kind = "bool"
+            self.values = array.array("b")
+        else:
+            self.kind = "object"
+            self.values = []
+
+    def __len__(self):
+        if self.kind == "datetime":
+            return len(self.values) + len(self.pending)
+        return len(self.values)
+
+    def append(self, value):
+        self.seen = True
+        if self.kind == "datetime":
+            self.pending.append(value)
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+        elif self.kind == "int":
+            self.values.append(int(value))
+        elif self.kind == "bool":
+            self.values.append(bool(value))
+        else:
+            self.values.append(value)
+
+    def append_missing(self):
+        "Same as dictExtractor, a missing key becomes np.nan"
+        if self.kind == "object":
+            self.values.append(np.nan)
+        else:
+            self.append(np.nan)
+
+    def flush(self):
+        "Parses the pending timestamps into nanoseconds"
+        if len(self.pending) > 0:
+            stamps = parse_timestamps(self.pending)
+            self.values.extend(stamps.view("int64"))
+            self.pending = []
+
+    def result(self):
+        "Returns the column as a numpy array (or list for object cols)"
+        if self.kind == "datetime":
+            self.flush()
+            return np.frombuffer(self.values, dtype=np.int64).view("datetime64[ns]")
+        elif self.kind == "int":
+            return np.frombuffer(self.values, dtype=np.int64)
+        elif self.kind == "bool":
+            return np.frombuffer(self.values, dtype=np.int8).astype(bool)
+        return self.values
+
+
+def json_array_iterator(f, chunk_size=2 ** 16):
+    """
+    Yields each element of the json array in the open file `f`, reading `chunk_size`
+    characters at a time instead of loading the whole file
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+
+    def read():
+        chunk = f.read(chunk_size)
+        if isinstance(chunk, bytes):
+            chunk = utf8.decode(chunk, final=len(chunk) == 0)
+        return chunk
+
+    buffer = read().lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Chat json must be a list of dictionaries")
+    pos = 1
+    while True:
+        # skip whitespace and commas between elements
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer):
+                break
+            chunk = read()
+            if not chunk:
+                raise ValueError("Chat json ended before the closing ]")
+            buffer, pos = chunk, 0
+        if buffer[pos] == "]":
+            return
+        try:
+            element, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # element is cut off by the end of the buffer, read more
+            chunk = read()
+            if not chunk:
+                raise
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        yield element
+        pos = end
+
+
+class columnExtractor:
+    def __init__(self, dict_list, label="", skip=()):
+        """
+        Columnar version of `dictExtractor`. Uses the longest dictionary's keys
+        like `dictExtractor` does, but builds each column in one pass over the
+        list instead of appending to every column row by row. Result stored
+        as `self.result`.
+
+        input
+        -----
+        dict_list: list
+            A column from twitch data where each row is a dict
+        label: str
+            What will be appended to the end of each col
+        skip: list
+            Labeled col names that should not be extracted at all
+        """
+        lengths = [len(x) for x in dict_list]
+        # first dict with the most keys, same as dictExtractor
+        max_d = dict_list[lengths.index(max(lengths))].keys()
+        self.max_d = [k for k in max_d if k + label not in skip]
+
+        new_dict = {}
+        for k in self.max_d:
+            new_dict[k + label] = [x.get(k, np.nan) for x in dict_list]
+        self.result = pd.DataFrame(new_dict)
+
+
 class dfSplitter:
     def __init__(self, dataframe):
         """
@@ -154,7 +639,7 @@ class dfSplitter:
             List of dataframes
         """
         # init function finds the first split
-        dataframe = dataframe.sort_values("created_at")
+        dataframe = dataframe.sort_values("created_at", kind="mergesort")  # stable, ties keep order
         first = dataframe[
             dataframe["created_at"]
             <= dataframe.loc[0, "created_at"] + pd.Timedelta(hours=1)
@@ -169,11 +654,14 @@ class dfSplitter:
 
     def find_rest(self):
         """
-        Uses last index of first split to find the others
+        Uses last index of first split to find the others. Loops instead of
+        recursing, so long streams don't hit the recursion limit.
+
+        NOTE: `get_chunks` and `chunk_bounds` no longer use this class
         """
         dataframe = self.dataframe
-        last_i = self.last_i
-        if last_i + 1 != len(dataframe):
+        while self.last_i + 1 != len(dataframe):
+            last_i = self.last_i
             new_df = dataframe.loc[last_i + 1 :, :]  # clip df to start at last_i
             newest = new_df[
                 new_df["created_at"]
@@ -181,10 +669,7 @@ class dfSplitter:
             ]  # filter by hour
             self.result.append(newest)  # store in list
             self.last_i = newest.index.max()
-
-            self.find_rest()  # repeat
-        else:
-            return dataframe  # never actually used
+        return dataframe  # never actually used
 
 
 class xminChats:
@@ -203,7 +688,7 @@ class xminChats:
         """
 
         # init function finds the first split
-        dataframe = dataframe.sort_values("created_at")
+        dataframe = dataframe.sort_values("created_at", kind="mergesort")  # stable, ties keep order
         first = dataframe[
             dataframe["created_at"] <= dataframe.iloc[0, 0] + pd.Timedelta(minutes=min_)
         ]
@@ -220,13 +705,16 @@ class xminChats:
 
     def find_rest(self):
         """
-        Uses last index of first split to find the others
+        Uses last index of first split to find the others. Loops instead of
+        recursing, so long streams don't hit the recursion limit.
+
+        NOTE: `get_chunks` and `chunk_bounds` no longer use this class
         """
         dataframe = self.dataframe
-        last_i = self.last_i
-        if (
-            last_i + 1 < dataframe.index.max()
+        while (
+            self.last_i + 1 < dataframe.index.max()
         ):  # NOT len(dataframe), that bugs out and i dont wanna explain why
+            last_i = self.last_i
             new_df = dataframe.loc[
                 last_i + 1 :, :
             ]  # clip df to start new min_ min calc at last_i+1
@@ -238,21 +726,27 @@ class xminChats:
             self.result.append(newest)  # store in list
 
             self.last_i = newest.index.max()
-            self.find_rest()  # repeat
-        else:
-            x = ""
 
 
-def get_chunks(dataframe, min_=2):
+def get_chunks(dataframe, min_=2, bounds=None, offsets=False, labeled=False):
     """
-    Iterates through the data_helper classes to divide dataframe into chunks
+    Divides dataframe into 1 hour long pieces, then each hour into `min_` long chunks.
+    See `chunk_bounds` for how the splits are found.
 
     input
     -----
     dataframe: pd.DataFrame
         The entire twitch stream chat df
     min_: int
-        The min_ value to pass into xminChats()
+        Minute range of each chunk
+    bounds: tuple or None
+        Output of `chunk_bounds` for this dataframe (ex: from `chatFrame.get_bounds`).
+        If given, dataframe must be the df the bounds were found on.
+    offsets: bool
+        True to return the output of `chunk_bounds` (row offsets into dataframe sorted
+        by `created_at`) instead of a list of dataframes
+    labeled: bool
+        True to return all chunks as one dataframe instead of a list, see `label_chunks`
 
     output
     ------
@@ -261,30 +755,1240 @@ def get_chunks(dataframe, min_=2):
     chunk_list:
         List of `min_` long dataframes
     """
-    dhs = dfSplitter(dataframe)
-    dhs.find_rest()
-    hour_list = dhs.result
+    if bounds is None:
+        dataframe = dataframe.sort_values("created_at", kind="mergesort")
+        bounds = chunk_bounds(dataframe, min_=min_)
+    if offsets:
+        return bounds
 
-    first_stamp = hour_list[0]
-    del hour_list[0]
+    first_stamp, hour_bounds, chunk_bounds_ = bounds
+    if labeled:
+        chunk_df, chunk_offsets = label_chunks(dataframe, chunk_bounds_)
+        return first_stamp, chunk_df, chunk_offsets
 
     chunk_list = []
-    for i in range(len(hour_list)):
-        hour = hour_list[i]
-
-        dhx = xminChats(hour, dataframe["_id"].unique(), min_=min_)
-        dhx.find_rest()
-        chunks = dhx.result
-
-        for x in range(len(chunks)):
-            chunk = chunks[x]
-            chunk["hour"] = i
-            chunk["chunk"] = x
-            chunk_list.append(chunk)
+    for hour, chunk, start, stop in chunk_bounds_:
+        chunk_df = dataframe.iloc[start:stop].copy()
+        chunk_df["hour"] = hour
+        chunk_df["chunk"] = chunk
+        chunk_list.append(chunk_df)
     return first_stamp, chunk_list
 
 
-def results_jsonified(results, first_sec, results_col):
+def label_chunks(dataframe, bounds):
+    """
+    Puts every chunk in one dataframe instead of a list of dataframes. Chunks keep
+    their order, so each chunk is a contiguous block of rows and can be aggregated
+    with one `groupby(["hour", "chunk"])` or `np.add.reduceat(values, offsets[:, 0])`.
+
+    input
+    -----
+    dataframe: pd.DataFrame
+        Twitch chat df the bounds were found on, sorted by `created_at`
+    bounds: np.array
+        One [hour, chunk, start, stop] row per chunk, from `chunk_bounds`
+
+    output
+    ------
+    chunk_df: pd.DataFrame
+        The rows of dataframe that are in a chunk, with int `hour` and `chunk` cols
+    offsets: np.array
+        One [start, stop] row per chunk, row offsets into chunk_df
+    """
+    lengths = bounds[:, 3] - bounds[:, 2]
+    stops = np.cumsum(lengths)
+    starts = stops - lengths
+    # row of dataframe for each row of chunk_df, all chunks at once
+    rows = np.arange(stops[-1] if len(stops) else 0) + np.repeat(bounds[:, 2] - starts, lengths)
+
+    chunk_df = dataframe.iloc[rows]
+    chunk_df["hour"] = np.repeat(bounds[:, 0], lengths)
+    chunk_df["chunk"] = np.repeat(bounds[:, 1], lengths)
+    offsets = np.stack([starts, stops], axis=1)
+    return chunk_df, offsets
+
+
+def chunk_bounds(dataframe, min_=2):
+    """
+    Finds where each hour and each `min_` chunk starts and stops, as row offsets.
+    Same greedy splits the `dfSplitter` and `xminChats` classes make:
+      - an hour starts at the first message after the last hour, and has every
+        message sent within 1 hour of it
+      - in each hour, a chunk starts at the first message after the last chunk,
+        and has every message of that hour sent within `min_` minutes of it
+      - when only 1 message of the hour is left, it is not put in a chunk
+
+    Each window's end is found with `np.searchsorted` on the sorted timestamps,
+    so this takes one pass instead of filtering the df once per chunk.
+
+    input
+    -----
+    dataframe: pd.DataFrame
+        The entire twitch stream chat df, sorted by `created_at`
+    min_: int
+        Minute range of each chunk
+
+    output
+    ------
+    first_stamp: datetime
+        The very first timestamp of dataframe
+    hour_bounds: np.array
+        One [start, stop] row per hour, stop not included
+    bounds: np.array
+        One [hour, chunk, start, stop] row per chunk, stop not included
+    """
+    created_at = dataframe["created_at"]
+    stamps = created_at.values.view("int64")  # nanoseconds
+    first_stamp = created_at.iloc[0]
+    min_ns = pd.Timedelta(minutes=min_).value
+    # end of the min_ window that would start at each message
+    window_stops = np.searchsorted(stamps, stamps + min_ns, side="right")
+
+    hour_bounds = find_hours(stamps)
+
+    bounds = []
+    for i in range(len(hour_bounds)):
+        start, hour_stop = hour_bounds[i]
+        x = 0
+        while True:
+            stop = min(window_stops[start], hour_stop)
+            bounds.append([i, x, start, stop])
+            x += 1
+            if stop + 1 >= hour_stop:
+                break  # 1 or 0 messages left in the hour
+            start = stop
+
+    bounds = np.array(bounds, dtype=np.int64).reshape(-1, 4)
+    return first_stamp, hour_bounds, bounds
+
+
+def find_hours(stamps):
+    """
+    One [start, stop] row per greedy hour of the sorted `stamps` (int64 nanoseconds),
+    see `chunk_bounds`
+    """
+    hour_ns = pd.Timedelta(hours=1).value
+    hour_bounds = []
+    start = 0
+    while start < len(stamps):
+        stop = np.searchsorted(stamps, stamps[start] + hour_ns, side="right")
+        hour_bounds.append([start, stop])
+        start = stop
+    return np.array(hour_bounds, dtype=np.int64).reshape(-1, 2)
+
+
+def sliding_bounds(dataframe, min_=2, step=30):
+    """
+    Finds overlapping `min_` windows, one starting every `step` seconds from the first
+    message, as row offsets in the same layout as `chunk_bounds`. A highlight that
+    `chunk_bounds` would split between two chunks is then whole in some window.
+      - a window has every message sent within `min_` minutes of its start time
+      - windows without messages, or with the same messages as the window
+        before, are left out
+      - the hour of a window is the hour of its first message
+
+    input
+    -----
+    dataframe: pd.DataFrame
+        The entire twitch stream chat df, sorted by `created_at`
+    min_: int
+        Minute length of each window
+    step: float
+        Seconds between the start of one window and the next
+
+    output
+    ------
+    first_stamp: datetime
+        The very first timestamp of dataframe
+    hour_bounds: np.array
+        One [start, stop] row per hour, stop not included
+    bounds: np.array
+        One [hour, window, start, stop] row per window, stop not included
+    """
+    created_at = dataframe["created_at"]
+    stamps = created_at.values.view("int64")  # nanoseconds
+    first_stamp = created_at.iloc[0]
+    hour_bounds = find_hours(stamps)
+    min_ns = pd.Timedelta(minutes=min_).value
+    step_ns = pd.Timedelta(seconds=step).value
+
+    window_times = np.arange(stamps[0], stamps[-1] + 1, step_ns)
+    starts = np.searchsorted(stamps, window_times, side="left")
+    stops = np.searchsorted(stamps, window_times + min_ns, side="right")
+    # starts and stops only go up, so repeated windows are next to each other
+    keep = stops > starts
+    keep[1:] &= (starts[1:] != starts[:-1]) | (stops[1:] != stops[:-1])
+    starts, stops = starts[keep], stops[keep]
+
+    hours = np.searchsorted(hour_bounds[:, 0], starts, side="right") - 1
+    bounds = np.stack([hours, np.arange(len(starts)), starts, stops], axis=1).astype(np.int64)
+    return first_stamp, hour_bounds, bounds
+
+
+def previous_seen(codes):
+    """
+    Position of the previous element with the same code, -1 if it is the first one.
+    An element is the first of its code inside positions [start, stop) when its
+    previous_seen is < start, which is how unique chatters are counted without sets.
+
+    input
+    -----
+    codes: np.array
+        Int codes, ex: chatter ids from `pd.factorize`
+
+    output
+    ------
+    prev: np.array
+        Same length as codes
+    """
+    order = np.argsort(codes, kind="mergesort")  # same codes stay in position order
+    same = codes[order[1:]] == codes[order[:-1]]
+    prev = np.full(len(codes), -1, dtype=np.int64)
+    prev[order[1:][same]] = order[:-1][same]
+    return prev
+
+
+def distinct_counts(prev, starts, stops):
+    """
+    Number of distinct codes in each window [starts[i], stops[i]), given `previous_seen`
+    of the codes. Windows that only move forward (starts and stops never go down, ex:
+    chunks, hours, sliding windows) are counted in O(n log n) however much they overlap,
+    other windows cost the sum of their lengths.
+
+    A code is new in [s, e) at position j when s <= j < e and prev[j] < s. Every
+    position j < s has prev[j] < j < s, so the count is #{j < e : prev[j] < s} - s.
+    With forward moving windows, the windows where j < e and prev[j] < s are the ones
+    from a certain window on, so each position adds 1 to a difference array.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    stops = np.asarray(stops, dtype=np.int64)
+    if np.all(np.diff(starts) >= 0) and np.all(np.diff(stops) >= 0):
+        positions = np.arange(len(prev))
+        first_window = np.maximum(
+            np.searchsorted(stops, positions, side="right"),
+            np.searchsorted(starts, prev, side="right"),
+        )
+        counted = np.cumsum(np.bincount(first_window, minlength=len(starts) + 1))[: len(starts)]
+        return counted - starts
+    rows, window = range_rows(starts, stops)
+    first = prev[rows] < starts[window]
+    return np.bincount(window, weights=first, minlength=len(starts)).astype(np.int64)
+
+
+def range_rows(starts, stops):
+    """
+    All positions of the ranges [starts[i], stops[i]) back to back, and which range each belongs to
+    """
+    lengths = stops - starts
+    window = np.repeat(np.arange(len(starts)), lengths)
+    first_row = np.cumsum(lengths) - lengths  # row of each range's first position
+    rows = starts[window] + np.arange(len(window)) - first_row[window]
+    return rows, window
+
+
+def message_features(big_df):
+    """
+    Counts of each message that `featureStore` sums over windows
+
+    output
+    ------
+    features: dict
+        messages (always 1), num_words_emo (len(body.split(" "))), num_emo (len(emoticons))
+        and num_words (the difference) np.arrays. Taken from the num_words_emo and num_emo
+        columns instead of body and emoticons if big_df has them.
+    """
+    if "num_words_emo" in big_df.columns:  # already counted, see `compact_frame`
+        num_words_emo = big_df["num_words_emo"].values.astype(np.int64)
+    else:
+        num_words_emo = big_df["body"].str.count(" ").values + 1  # same as len(body.split(" "))
+    if "num_emo" in big_df.columns:
+        num_emo = big_df["num_emo"].values.astype(np.int64)
+    elif "emoticons" in big_df.columns:
+        num_emo = big_df["emoticons"].str.len().fillna(0).values.astype(np.int64)
+    else:
+        num_emo = np.zeros(len(big_df), dtype=np.int64)
+    features = {
+        "messages": np.ones(len(big_df), dtype=np.int64),
+        "num_words_emo": num_words_emo,
+        "num_emo": num_emo,
+        "num_words": num_words_emo - num_emo,
+    }
+    return features
+
+
+class featureStore:
+    def __init__(self, big_df, bin_sec=1):
+        """
+        Message count, word count, emoticon count and chatters of a twitch chat,
+        found once per message and per `bin_sec` second bin. The sums and unique
+        chatters of any window then come from prefix sums and `previous_seen`,
+        without rescanning the messages. Get it from `chatFrame.get_features`.
+
+        Windows are [start, stop) positions into big_df, ex: columns 2 and 3 of
+        `chunk_bounds`, or [first, stop) bins for the `bin_` methods.
+
+        input
+        -----
+        big_df: pd.DataFrame
+            Organized twitch chat, sorted by `created_at`
+        bin_sec: float
+            Length of each bin in seconds, counted from the first message
+        """
+        stamps = big_df["created_at"].values
+        features = message_features(big_df)
+        self.bin_sec = bin_sec
+        self.prefix = {
+            name: np.concatenate([[0], np.cumsum(values)]) for name, values in features.items()
+        }
+
+        # chatters, as ints
+        self.codes, self.chatter_ids = pd.factorize(big_df["_id"])  # ids in order of first message
+        self.num_chatters = self.codes.max() + 1 if len(self.codes) else 0
+        self.prev_seen = previous_seen(self.codes)
+
+        # bins
+        if len(stamps):
+            elapsed = (stamps - stamps[0]) // np.timedelta64(1, "ns")
+            self.bin_of = elapsed // int(round(bin_sec * 10 ** 9))
+        else:
+            self.bin_of = np.array([], dtype=np.int64)
+        self.num_bins = self.bin_of[-1] + 1 if len(self.bin_of) else 0
+        self.bin_prefix = {
+            name: np.concatenate(
+                [[0], np.cumsum(np.bincount(self.bin_of, weights=values, minlength=self.num_bins))]
+            ).astype(np.int64)
+            for name, values in features.items()
+        }
+        # chatters of each bin, each once, bin by bin. bin_ptr[b]:bin_ptr[b+1] are bin b's
+        pairs = np.unique(self.bin_of * max(self.num_chatters, 1) + self.codes)
+        pair_bins = pairs // max(self.num_chatters, 1)
+        self.bin_chatters = pairs % max(self.num_chatters, 1)
+        self.bin_ptr = np.searchsorted(pair_bins, np.arange(self.num_bins + 1))
+        self.bin_prev_seen = previous_seen(self.bin_chatters)
+
+    def sums(self, feature, starts, stops):
+        """
+        Total of `feature` ("messages", "num_words_emo", "num_emo", "num_words") in each window
+        """
+        return self.prefix[feature][stops] - self.prefix[feature][starts]
+
+    def chatter_sums(self, feature):
+        """
+        Total of `feature` of each chatter over the whole chat, in order of `self.chatter_ids`
+        """
+        values = np.diff(self.prefix[feature])
+        return np.bincount(self.codes, weights=values, minlength=self.num_chatters).astype(np.int64)
+
+    def uniques(self, starts, stops):
+        """
+        Number of unique chatters in each window
+        """
+        return distinct_counts(self.prev_seen, starts, stops)
+
+    def bin_sums(self, feature, first_bins, stop_bins):
+        """
+        Total of `feature` in each window of bins
+        """
+        return self.bin_prefix[feature][stop_bins] - self.bin_prefix[feature][first_bins]
+
+    def bin_uniques(self, first_bins, stop_bins):
+        """
+        Number of unique chatters in each window of bins, from the chatters of each bin
+        """
+        return distinct_counts(self.bin_prev_seen, self.bin_ptr[first_bins], self.bin_ptr[stop_bins])
+
+
+def hll_hashes(values):
+    """
+    64 bit hash of each value (`pd.util.hash_array`), same value same hash in every run.
+    Ints (ex: `_id`) are hashed as int64, a lot faster than as python objects.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in "iub":
+        return pd.util.hash_array(values.astype(np.int64))
+    return pd.util.hash_array(values.astype(object))
+
+
+def hll_rank(hashes, precision=12):
+    """
+    HyperLogLog register of each hash (its first `precision` bits) and the value it
+    puts there: 1 + the number of leading zeros of the bits left
+    """
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rest = hashes << np.uint64(precision)
+    # bit length, from the float exponent of each 32 bit half (exact below 2**53)
+    high = np.frexp((rest >> np.uint64(32)).astype(np.float64))[1]
+    low = np.frexp((rest & np.uint64(2 ** 32 - 1)).astype(np.float64))[1]
+    bit_length = np.where(high > 0, high + 32, low)
+    rank = np.minimum(64 - bit_length + 1, 64 - precision + 1).astype(np.uint8)
+    return index, rank
+
+
+def hll_count(registers):
+    """
+    Estimated number of distinct values of each HyperLogLog sketch (last axis), with
+    linear counting for small counts. The standard error is about 1.04/sqrt(2**precision),
+    ex: 1.6% for precision 12, and smaller for counts below 2.5 * 2**precision.
+    """
+    m = registers.shape[-1]
+    alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+    raw = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)), axis=-1)
+    zeros = np.sum(registers == 0, axis=-1)
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+class hllSketch:
+    def __init__(self, precision=12):
+        """
+        HyperLogLog sketch of distinct values that can stand in for a set: `update`
+        it with values and `len` it for the estimated count. Takes 2**precision bytes
+        however many values go in, see `hll_count` for the error.
+        """
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype=np.uint8)
+
+    def update(self, values):
+        index, rank = hll_rank(hll_hashes(values), self.precision)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        """
+        Adds the values of another sketch with the same precision
+        """
+        self.registers = np.maximum(self.registers, other.registers)
+
+    def __len__(self):
+        return int(round(float(hll_count(self.registers))))
+
+
+class sketchStore:
+    def __init__(self, big_df, precision=12, bin_sec=60):
+        """
+        HyperLogLog sketches of the chatters of a twitch chat, one per `bin_sec` second bin,
+        built straight from the hashed `_id`s without the exact `featureStore`. The unique
+        chatters of any window are estimated by merging the sketches of the bins inside it
+        and adding the messages at its edges one by one, so each window counts exactly its
+        own messages. Get it from `chatFrame.get_sketches`.
+
+        input
+        -----
+        big_df: pd.DataFrame
+            Organized twitch chat, sorted by `created_at`
+        precision: int
+            4 to 16, each sketch is 2**precision bytes, see `hll_count` for the error
+        bin_sec: float
+            Length of each bin in seconds, counted from the first message
+        """
+        stamps = big_df["created_at"].values
+        self.precision = precision
+        self.bin_sec = bin_sec
+        # register and value of each message's chatter
+        index, self.rank = hll_rank(hll_hashes(big_df["_id"].values), precision)
+        self.index = index.astype(np.int32)
+
+        if len(stamps):
+            elapsed = (stamps - stamps[0]) // np.timedelta64(1, "ns")
+            bin_of = elapsed // int(round(bin_sec * 10 ** 9))
+        else:
+            bin_of = np.array([], dtype=np.int64)
+        num_bins = bin_of[-1] + 1 if len(bin_of) else 0
+        self.bin_ptr = np.searchsorted(bin_of, np.arange(num_bins + 1))  # bin b is bin_ptr[b]:bin_ptr[b+1]
+        # one row per bin, plus an empty last row so np.maximum.reduceat can stop at num_bins
+        self.registers = np.zeros((num_bins + 1, 2 ** precision), dtype=np.uint8)
+        np.maximum.at(self.registers, (bin_of, self.index), self.rank)
+
+    def uniques(self, starts, stops, block_mb=64):
+        """
+        Estimated number of unique chatters in each [start, stop) window of messages.
+        Windows are merged `block_mb` MB of sketches at a time.
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        stops = np.asarray(stops, dtype=np.int64)
+        # bins that are entirely inside each window, [first_bin, stop_bin)
+        first_bin = np.searchsorted(self.bin_ptr, starts, side="left")
+        stop_bin = np.searchsorted(self.bin_ptr, stops, side="right") - 1
+        has_bins = stop_bin > first_bin
+        # messages before the first whole bin, and after the last one
+        left_stop = np.where(has_bins, self.bin_ptr[np.minimum(first_bin, len(self.bin_ptr) - 1)], stops)
+        right_start = np.where(has_bins, self.bin_ptr[np.maximum(stop_bin, 0)], stops)
+
+        m = self.registers.shape[1]
+        block = max(1, block_mb * 2 ** 20 // m)
+        counts = np.zeros(len(starts))
+        for first in range(0, len(starts), block):
+            rows = slice(first, first + block)
+            merged = np.zeros((len(starts[rows]), m), dtype=np.uint8)
+            with_bins = np.nonzero(has_bins[rows])[0]
+            if len(with_bins):
+                # reduceat of [first, stop, first, stop, ...] merges each window's bins on the even rows
+                edges = np.stack([first_bin[rows][with_bins], stop_bin[rows][with_bins]], axis=1)
+                merged[with_bins] = np.maximum.reduceat(self.registers, edges.ravel())[::2]
+            for edge_starts, edge_stops in [
+                (starts[rows], left_stop[rows]),
+                (right_start[rows], stops[rows]),
+            ]:
+                window, pos = range_positions(edge_starts, edge_stops)
+                np.maximum.at(merged, (window, self.index[pos]), self.rank[pos])
+            counts[rows] = hll_count(merged)
+        return counts
+
+
+def range_positions(starts, stops):
+    """
+    Every position of every [start, stop) range, and which range it is in
+    """
+    lengths = np.maximum(stops - starts, 0)
+    labels = np.repeat(np.arange(len(starts)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return labels, np.repeat(starts, lengths) + offsets
+
+
+class stageProfiler:
+    def __init__(self, memory=False, callback=None):
+        """
+        Records how long each stage of a run takes, ex: ingest, chunking, scoring and
+        json conversion. Pass it (or True, or a callback) as `profile` to `chatFrame`,
+        any `algoX.run` or `brain.run`. Without it every stage is a `contextlib.nullcontext`,
+        so runs that are not profiled only pay for one `is None` check per stage.
+
+        Stages can be nested, ex: `algo1.chunk_uniques` inside `algo1.run`. Each thread
+        keeps its own nesting, so the times of `brain.run(executor="threads")` are fine,
+        but `tracemalloc` counts the whole process, so with memory=True the memory of a
+        stage includes what the other threads allocated meanwhile. Worker processes
+        (`executor="processes"`) record into their own copy, which is lost.
+
+        input
+        -----
+        memory: bool
+            True to also record the memory each stage allocated with `tracemalloc`
+            (started here if it isn't already, and stopped again by `close`, ex: with
+            `with stageProfiler(memory=True) as profiler:`). Makes the run a lot slower.
+            The peak of each stage needs python 3.9+ (`tracemalloc.reset_peak`).
+        callback: function or None
+            Called with each stage's record as soon as the stage ends, ex: to log it
+        """
+        self.memory = memory
+        self.callback = callback
+        self.stages = []  # one record per finished stage, in order of when they ended
+        self.local = threading.local()  # open stages of each thread
+        self.open_records = []  # open stages of every thread, for their peaks
+        self.lock = threading.Lock()
+        self.started = memory and not tracemalloc.is_tracing()  # tracing is ours to stop
+        if self.started:
+            tracemalloc.start()
+
+    def __reduce__(self):
+        # worker processes get an empty profiler, locks and callbacks don't pickle
+        return (stageProfiler, (self.memory,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+        Stops `tracemalloc` if this profiler started it, so later runs aren't traced
+        """
+        if self.started:
+            tracemalloc.stop()
+            self.started = False
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=None):
+        """
+        Times the code run inside `with profiler.stage(name, rows):`
+
+        input
+        -----
+        name: str
+            Name of the stage, ex: "algo1.chunk_uniques"
+        rows: int or None
+            Number of messages/chunks the stage works on, kept in the record
+        """
+        open_stages = getattr(self.local, "open", None)
+        if open_stages is None:
+            open_stages = self.local.open = []
+        record = {
+            "stage": name,
+            "parent": open_stages[-1]["stage"] if open_stages else None,
+            "depth": len(open_stages),
+            "rows": rows,
+        }
+        memory = self.memory and tracemalloc.is_tracing()
+        if memory:
+            with self.lock:
+                current, peak = tracemalloc.get_traced_memory()
+                if RESET_PEAK:
+                    for other in self.open_records:
+                        # reset_peak below would lose the peak of the stages still open
+                        other["peak"] = max(other["peak"], peak)
+                    tracemalloc.reset_peak()
+                    record["peak"] = current
+                record["current"] = current
+                self.open_records.append(record)
+        open_stages.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            open_stages.pop()
+            if memory:
+                with self.lock:
+                    current, peak = tracemalloc.get_traced_memory()
+                    self.open_records.remove(record)
+                    before = record.pop("current")
+                    record["alloc_mb"] = (current - before) / 2 ** 20
+                    if RESET_PEAK:
+                        peak = max(record.pop("peak"), peak)
+                        record["peak_mb"] = (peak - before) / 2 ** 20
+                        for other in self.open_records:
+                            other["peak"] = max(other["peak"], peak)
+            self.stages.append(record)
+            if self.callback is not None:
+                self.callback(record)
+
+    def report(self):
+        """
+        output
+        ------
+        stages: list
+            One dictionary per finished stage with `stage`, `parent`, `depth`, `rows`,
+            `seconds` keys (+ `alloc_mb`, and `peak_mb` on python 3.9+, if memory=True), ex: for
+            `pd.DataFrame(stages)`
+        """
+        return [dict(record) for record in self.stages]
+
+
+def get_profiler(profile):
+    """
+    The `stageProfiler` asked for by a `profile` argument: None/False for none, True for
+    a new one, a function for a new one that calls it with each stage, or a `stageProfiler`
+    """
+    if profile is None or profile is False:
+        return None
+    if isinstance(profile, stageProfiler):
+        return profile
+    if profile is True:
+        return stageProfiler()
+    return stageProfiler(callback=profile)
+
+
+def profile_stage(profiler, name, rows=None):
+    """
+    `profiler.stage(name, rows)`, or a do nothing context if profiler is None
+    """
+    if profiler is None:
+        return NO_STAGE
+    return profiler.stage(name, rows)
+
+
+NO_STAGE = contextlib.nullcontext()
+RESET_PEAK = hasattr(tracemalloc, "reset_peak")  # python 3.9+
+
+
+COMPACT_COLUMNS = ["created_at", "_id", "body", "emoticons"]  # what the algos and compact_frame need
+
+
+def narrow_int(values):
+    """
+    values as the smallest signed int dtype that holds all of them
+    """
+    values = np.asarray(values)
+    if len(values) == 0:
+        return values.astype(np.int8)
+    low, high = values.min(), values.max()
+    for dtype in [np.int8, np.int16, np.int32]:
+        if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+            return values.astype(dtype)
+    return values.astype(np.int64)
+
+
+def compact_frame(big_df, keep_user_vars=False):
+    """
+    Shrinks an organized df to what the algos read, for when memory is tight:
+      - `_id` becomes dense int32 codes, in order of each chatter's first message.
+        The real ids are returned as a lookup table, `chatter_ids[code]`
+      - `body` and `emoticons` become `num_words_emo` and `num_emo` counts in the
+        narrowest int dtype, see `message_features`
+      - every other column is dropped, or with keep_user_vars, text columns become category
+    `created_at` stays datetime64[ns], which is already an 8 byte int.
+
+    input
+    -----
+    big_df: pd.DataFrame
+        Organized twitch chat
+    keep_user_vars: bool
+        True to keep the other columns
+
+    output
+    ------
+    compact_df: pd.DataFrame
+        `created_at`, `_id`, `num_words_emo`, `num_emo` columns (+ the others if kept)
+    chatter_ids: np.array
+        Real `_id` of each code
+    """
+    features = message_features(big_df)
+    codes, chatter_ids = pd.factorize(big_df["_id"])
+    compact_df = pd.DataFrame(
+        {
+            "created_at": big_df["created_at"].values,
+            "_id": codes.astype(np.int32),
+            "num_words_emo": narrow_int(features["num_words_emo"]),
+            "num_emo": narrow_int(features["num_emo"]),
+        }
+    )
+    if keep_user_vars:
+        for col in big_df.columns:
+            if col in COMPACT_COLUMNS:
+                continue
+            values = big_df[col].reset_index(drop=True)
+            if values.dtype == object:
+                try:
+                    values = values.astype("category")
+                except TypeError:  # lists, ex: fragments
+                    pass
+            compact_df[col] = values
+    return compact_df, np.asarray(chatter_ids)
+
+
+def column_memory(dataframe):
+    """
+    MB used by each column of dataframe, strings and lists included, with a `total` row
+    """
+    memory = dataframe.memory_usage(index=False, deep=True) / 2 ** 20
+    memory["total"] = memory.sum()
+    return memory
+
+
+def save_frame(big_df, folder, arrays={}):
+    """
+    Saves an organized df as a folder of typed columns that `load_frame` can memory map:
+    one .npy per number, bool or datetime column, codes .npy + categories for category
+    columns, and one json array per object column (body, emoticons...). Written to a
+    temporary folder first, so a half written frame is never loaded.
+
+    input
+    -----
+    big_df: pd.DataFrame
+        Organized twitch chat, ex: `chatFrame.big_df`
+    folder: str
+        Folder to save to, replaced if it exists
+    arrays: dict
+        name:np.array of anything else to save with the df, ex: `compact_frame`'s
+        chatter_ids. Saved as name.npy in folder.
+    """
+    temp = f"{folder}.{os.getpid()}.tmp"
+    os.makedirs(temp, exist_ok=True)
+    for name, values in arrays.items():
+        np.save(os.path.join(temp, f"{name}.npy"), values)
+    meta = {"rows": len(big_df), "columns": []}
+    for i, col in enumerate(big_df.columns):
+        series = big_df[col]
+        info = {"name": col, "file": f"col{i}"}
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            info["kind"] = "category"
+            info["categories"] = series.cat.categories.tolist()
+            np.save(os.path.join(temp, f"col{i}.npy"), series.cat.codes.values)
+        elif isinstance(series.dtype, pd.DatetimeTZDtype):
+            info["kind"] = "datetimetz"
+            info["tz"] = str(series.dt.tz)
+            np.save(os.path.join(temp, f"col{i}.npy"), series.dt.tz_convert("UTC").dt.tz_localize(None).values)
+        elif series.dtype == object:
+            info["kind"] = "json"
+            with open(os.path.join(temp, f"col{i}.json"), "w", encoding="utf-8") as f:
+                json.dump(series.tolist(), f, default=str)
+        else:
+            info["kind"] = "npy"
+            np.save(os.path.join(temp, f"col{i}.npy"), series.values)
+        meta["columns"].append(info)
+    with open(os.path.join(temp, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    if os.path.isdir(folder):
+        old = f"{folder}.{os.getpid()}.old"
+        os.replace(folder, old)
+        os.replace(temp, folder)
+        for name in os.listdir(old):
+            os.remove(os.path.join(old, name))
+        os.rmdir(old)
+    else:
+        os.replace(temp, folder)
+
+
+def load_frame(folder, mmap=True):
+    """
+    Loads a df saved by `save_frame`
+
+    input
+    -----
+    folder: str
+        Folder given to `save_frame`
+    mmap: bool
+        True to memory map the .npy columns, so they are only read from disk when used and
+        shared with other processes that load the same frame. Object columns are always
+        read into memory, they can't be memory mapped.
+
+    output
+    ------
+    big_df: pd.DataFrame
+        Same columns, dtypes and values as the saved df, with a new RangeIndex
+    """
+    with open(os.path.join(folder, "meta.json")) as f:
+        meta = json.load(f)
+    mmap_mode = "r" if mmap else None
+    columns = {}
+    for info in meta["columns"]:
+        path = os.path.join(folder, info["file"])
+        if info["kind"] == "json":
+            with open(path + ".json", encoding="utf-8") as f:
+                values = pd.Series(json.load(f), dtype=object)
+        else:
+            values = np.load(path + ".npy", mmap_mode=mmap_mode)
+            if info["kind"] == "category":
+                values = pd.Categorical.from_codes(values, categories=info["categories"])
+            elif info["kind"] == "datetimetz":
+                values = pd.DatetimeIndex(values).tz_localize("UTC").tz_convert(info["tz"])
+        columns[info["name"]] = pd.Series(values, copy=False)
+    big_df = pd.DataFrame(columns, copy=False)
+    return big_df
+
+
+class chatFrame:
+    def __init__(
+        self, data, keep_user_vars=False, profile=None, frame_cache=None, compact=False, columns=None
+    ):
+        """
+        Organizes the twitch chat once so that the same stream can be shared by
+        several algorithms, ex: `brain.run`. Every `algoX.run` accepts it in place
+        of `data`.
+
+        Stores the organized df sorted by `created_at` as `self.big_df`, the sorted
+        timestamps as `self.timestamps`, the chunk boundaries of each `min_`
+        asked for so far in `self.bounds` and the `featureStore` of each bin size
+        in `self.features`.
+
+        input
+        -----
+        data: list, str, file-like, pd.DataFrame or Arrow table
+            List of dictionaries of data from Twitch chat. A path or open file of
+            the chat json is read with `stream_twitch_chat` instead. An already organized
+            df (or Arrow table) is used as is, see `ORGANIZED_SCHEMA`. If it is sorted
+            by `created_at` with a default index, it is not copied.
+        keep_user_vars: bool
+            Passed to `organize_twitch_chat`
+        profile: bool, function, stageProfiler or None
+            Records the time of ingest, sorting, chunking and features in `self.profiler`,
+            see `get_profiler`. Every algo run on this chatFrame records into it too.
+        frame_cache: str or None
+            Only for a path or open file. Folder where the organized df of each chat file is
+            saved with `save_frame`, in a folder named after the file's `data_hash`. If the
+            file was organized before, its df is memory mapped from there with `load_frame`
+            instead of reading the json again.
+        compact: bool
+            True to keep only what the algos read, with interned chatter ids and narrow
+            count columns, see `compact_frame`. The real chatter ids are in `self.chatter_ids`.
+        columns: list or None
+            Only for a list or a path/open file. Columns to organize, ex: `COMPACT_COLUMNS`
+            (what the algos read) so the rest are never parsed. If None, every column
+            (`COMPACT_COLUMNS` if compact).
+        """
+        self.profiler = get_profiler(profile)
+        self.chatter_ids = None  # compact only, real _id of each code
+        frame_folder = None
+        if frame_cache is not None and (isinstance(data, str) or hasattr(data, "read")):
+            digest = data_hash(data)
+            if digest is not None:
+                if compact:
+                    digest += "_compact"
+                elif columns is not None and not keep_user_vars:
+                    digest += "_" + "-".join(columns)  # fewer columns than a full frame
+                frame_folder = os.path.join(frame_cache, digest)
+        if frame_folder is not None and os.path.isfile(os.path.join(frame_folder, "meta.json")):
+            with profile_stage(self.profiler, "load_frame"):
+                big_df = load_frame(frame_folder)  # saved sorted
+            if len(big_df) == 0:
+                big_df = np.array([])
+            elif compact:
+                self.chatter_ids = np.load(os.path.join(frame_folder, "chatter_ids.npy"))
+        else:
+            # compact only needs a few columns, the rest are never read from the file/parsed
+            if keep_user_vars:
+                columns = None
+            elif compact:
+                columns = COMPACT_COLUMNS
+            if isinstance(data, str) or hasattr(data, "read"):
+                with profile_stage(self.profiler, "stream_twitch_chat"):
+                    if columns is None:
+                        big_df = stream_twitch_chat(data)
+                    else:
+                        big_df = stream_twitch_chat(data, columns=columns)
+            else:
+                with profile_stage(self.profiler, "organize_twitch_chat", rows=len(data)):
+                    big_df = organize_twitch_chat(data, keep_user_vars, columns=columns)
+            if type(big_df) == pd.DataFrame:
+                with profile_stage(self.profiler, "chatFrame.sort", rows=len(big_df)):
+                    big_df = sorted_frame(big_df)
+                if compact:
+                    with profile_stage(self.profiler, "compact_frame", rows=len(big_df)):
+                        big_df, self.chatter_ids = compact_frame(big_df, keep_user_vars)
+            if frame_folder is not None:
+                with profile_stage(self.profiler, "save_frame"):
+                    os.makedirs(frame_cache, exist_ok=True)
+                    arrays = {} if self.chatter_ids is None else {"chatter_ids": self.chatter_ids}
+                    save_frame(
+                        big_df if type(big_df) == pd.DataFrame else pd.DataFrame(),
+                        frame_folder,
+                        arrays=arrays,
+                    )
+        if type(big_df) == pd.DataFrame:
+            self.timestamps = big_df["created_at"].values
+        else:
+            self.timestamps = np.array([], dtype="datetime64[ns]")
+        self.big_df = big_df
+        self.empty = type(big_df) != pd.DataFrame
+        self.bounds = {}  # min_ or (min_, step):output of chunk_bounds or sliding_bounds
+        self.features = {}  # bin_sec:featureStore
+        self.sketches = {}  # (precision, bin_sec):sketchStore
+        self.hash = None  # data_hash of big_df, found the first time a resultCache needs it
+
+    def memory_usage(self):
+        """
+        MB used by each column of `self.big_df`, see `column_memory`
+        """
+        if self.empty:
+            return pd.Series({"total": 0.0})
+        return column_memory(self.big_df)
+
+    def get_bounds(self, min_=2, step=None):
+        """
+        Returns `chunk_bounds(self.big_df, min_)`, or `sliding_bounds(self.big_df, min_, step)`
+        if step is given, only calculated the first time each `min_` and step is asked for
+        """
+        key = min_ if step is None else (min_, step)
+        if key not in self.bounds:
+            if step is None:
+                with profile_stage(self.profiler, "chunk_bounds", rows=len(self.timestamps)):
+                    self.bounds[key] = chunk_bounds(self.big_df, min_=min_)
+            else:
+                with profile_stage(self.profiler, "sliding_bounds", rows=len(self.timestamps)):
+                    self.bounds[key] = sliding_bounds(self.big_df, min_=min_, step=step)
+        return self.bounds[key]
+
+    def get_features(self, bin_sec=1):
+        """
+        Returns `featureStore(self.big_df, bin_sec)`, only calculated the first time
+        each `bin_sec` is asked for
+        """
+        if bin_sec not in self.features:
+            with profile_stage(self.profiler, "featureStore", rows=len(self.timestamps)):
+                self.features[bin_sec] = featureStore(self.big_df, bin_sec=bin_sec)
+        return self.features[bin_sec]
+
+    def get_sketches(self, precision=12, bin_sec=60):
+        """
+        Returns `sketchStore(self.big_df, precision, bin_sec)`, only calculated the first
+        time each precision and `bin_sec` is asked for
+        """
+        key = (precision, bin_sec)
+        if key not in self.sketches:
+            with profile_stage(self.profiler, "sketchStore", rows=len(self.timestamps)):
+                self.sketches[key] = sketchStore(self.big_df, precision=precision, bin_sec=bin_sec)
+        return self.sketches[key]
+
+
+def sorted_frame(big_df):
+    """
+    big_df sorted by `created_at` (stable) with a 0 to n index. Returned as is if it
+    already is, so an organized df that was passed in isn't copied.
+    """
+    index = big_df.index
+    default_index = isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1
+    if big_df["created_at"].is_monotonic_increasing:
+        if default_index:
+            return big_df
+        return big_df.reset_index(drop=True)
+    return big_df.sort_values("created_at", kind="mergesort").reset_index(drop=True)
+
+
+def get_chat(data, profile=None, frame_cache=None):
+    """
+    `data` if it already is a `chatFrame`, else a `chatFrame` of only the `COMPACT_COLUMNS`
+    of data, the ones the algos read. If `profile` is given (see `get_profiler`), the
+    chatFrame records into that profiler from now on.
+    """
+    profiler = get_profiler(profile)
+    if not isinstance(data, chatFrame):
+        return chatFrame(data, profile=profiler, frame_cache=frame_cache, columns=COMPACT_COLUMNS)
+    if profiler is not None:
+        data.profiler = profiler
+    return data
+
+
+def profiled_results(results, profile, profiler):
+    """
+    What a run returns: results, or (results, `profiler.report()`) if the run was
+    given profile=True. A profiler made by the run (see `get_profiler`) is closed.
+    """
+    if profile not in (None, False) and not isinstance(profile, stageProfiler):
+        profiler.close()
+    if profile is True:
+        return results, profiler.report()
+    return results
+
+
+FILE_HASHES = {}  # (path, size, mtime):data_hash, so unchanged files are only read once
+
+
+def data_hash(data):
+    """
+    Hex digest of the content of a twitch chat, for `resultCache` keys. Files are hashed
+    by their bytes, lists by their json text and chatFrames by their organized df, so the
+    same chat given in 2 different forms gets 2 different hashes. Hashing a file is
+    much faster than hashing a list, which takes about as long as `organize_twitch_chat`.
+
+    input
+    -----
+    data: list, str, file-like, pd.DataFrame, Arrow table or chatFrame
+        Anything an `algoX.run` accepts as data
+
+    output
+    ------
+    digest: str or None
+        None if data can't be hashed without using it up, ex: a file that can't seek
+    """
+    if isinstance(data, chatFrame):
+        if data.hash is None:
+            data.hash = "chatFrame" + frame_hash(data.big_df if not data.empty else pd.DataFrame())
+        return data.hash
+    if isinstance(data, pd.DataFrame):
+        return "frame" + frame_hash(data)
+    if is_arrow(data):
+        return "frame" + frame_hash(data.to_pandas())
+    if isinstance(data, str):
+        stat = os.stat(data)
+        seen_key = (os.path.realpath(data), stat.st_size, stat.st_mtime_ns)
+        if seen_key not in FILE_HASHES:
+            with open(data, "rb") as f:
+                FILE_HASHES[seen_key] = data_hash(f)
+        return FILE_HASHES[seen_key]
+    hasher = hashlib.blake2b(digest_size=20)
+    if hasattr(data, "read"):
+        if not (hasattr(data, "seekable") and data.seekable()):
+            return None
+        start = data.tell()
+        block = data.read(2 ** 20)
+        while block:
+            hasher.update(block if isinstance(block, bytes) else block.encode("utf-8"))
+            block = data.read(2 ** 20)
+        data.seek(start)
+        return "file" + hasher.hexdigest()
+    hasher.update(json.dumps(data, default=str).encode("utf-8"))
+    return "list" + hasher.hexdigest()
+
+
+def frame_hash(dataframe):
+    """
+    Hex digest of the column names and values of a df, row order included, index not
+    """
+    hasher = hashlib.blake2b(digest_size=20)
+    for col in dataframe.columns:
+        hasher.update(str(col).encode("utf-8"))
+        try:
+            values = pd.util.hash_pandas_object(dataframe[col], index=False).values
+            hasher.update(values.tobytes())
+        except TypeError:  # lists, ex: emoticons
+            hasher.update(json.dumps(dataframe[col].tolist(), default=str).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def is_cache_file(name):
+    """
+    True if name is a `resultCache` file, "KEY.json" with the 40 hex digits of a key
+    """
+    key = name[:-5]
+    return (
+        name.endswith(".json") and len(key) == 40 and all(c in "0123456789abcdef" for c in key)
+    )
+
+
+class resultCache:
+    def __init__(self, max_items=128, max_mb=64, folder=None, max_disk_mb=1024):
+        """
+        Keeps the results of `algoX.run` and `brain.run` so the same chat with the same
+        params is only organized and scored once. Pass it as `cache` to any of them.
+
+        Results are found by `data_hash` of the chat + the function + its params + the
+        version of pillaralgos. Recently used results are kept as json in memory, the least
+        recently used are dropped once there are more than `max_items` or `max_mb`. With a
+        folder, every result is also saved there as a .json file, so other processes and later
+        runs can use it, and the least recently used files are deleted past `max_disk_mb`.
+        Results are only ever read back with `json.loads`, so a shared folder can't run code.
+        Results that aren't json (ex: the empty array of an empty chat) are not cached.
+
+        input
+        -----
+        max_items: int
+            Most results kept in memory
+        max_mb: float
+            Most MB of (json) results kept in memory
+        folder: str or None
+            Folder for the on disk cache, made if missing. If None, memory only.
+        max_disk_mb: float
+            Most MB of result files kept in folder
+        """
+        self.max_items = max_items
+        self.max_bytes = max_mb * 2 ** 20
+        self.folder = folder
+        self.max_disk_bytes = max_disk_mb * 2 ** 20
+        self.memory = OrderedDict()  # key:json of the result, least recently used first
+        self.memory_bytes = 0
+        self.disk = OrderedDict()  # key:file size, least recently used first
+        self.disk_bytes = 0
+        self.lock = threading.Lock()
+        self.counts = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+        }
+
+        if folder is not None:
+            os.makedirs(folder, exist_ok=True)
+            files = [entry for entry in os.scandir(folder) if is_cache_file(entry.name)]
+            for entry in sorted(files, key=lambda entry: entry.stat().st_mtime):
+                self.disk[entry.name[:-5]] = entry.stat().st_size
+                self.disk_bytes += entry.stat().st_size
+
+    def key(self, fctn, data, params):
+        """
+        Cache key of `fctn(data, **params)`, or None if data can't be hashed
+        """
+        digest = data_hash(data)
+        if digest is None:
+            return None
+        package = sys.modules.get(fctn.__module__.split(".")[0])
+        name = f"{fctn.__module__}.{fctn.__qualname__}"
+        version = getattr(package, "__version__", "")
+        params = repr(sorted(params.items()))
+        return hashlib.blake2b(
+            "|".join([digest, name, version, params]).encode("utf-8"), digest_size=20
+        ).hexdigest()
+
+    def run(self, fctn, data, unkeyed=(), **params):
+        """
+        Returns the cached result of `fctn(data, **params)`, running and caching it if missing.
+        Params named in `unkeyed` are passed to fctn but left out of the key, ex: the number
+        of workers, which doesn't change the result.
+        """
+        key = self.key(fctn, data, {k: v for k, v in params.items() if k not in unkeyed})
+        if key is None:
+            return fctn(data, **params)
+        encoded = self.get(key)
+        if encoded is not None:
+            try:
+                return json.loads(encoded)
+            except ValueError:  # a broken file, replaced below
+                pass
+        result = fctn(data, **params)
+        try:
+            encoded = json.dumps(result).encode("utf-8")
+        except TypeError:
+            return result
+        self.put(key, encoded)
+        return result
+
+    def get(self, key):
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.counts["memory_hits"] += 1
+                return self.memory[key]
+            if key in self.disk:
+                try:
+                    with open(self.disk_path(key), "rb") as f:
+                        encoded = f.read()
+                except OSError:  # deleted by someone else
+                    self.disk_bytes -= self.disk.pop(key)
+                else:
+                    self.disk.move_to_end(key)
+                    os.utime(self.disk_path(key))
+                    self.counts["disk_hits"] += 1
+                    self.add_to_memory(key, encoded)
+                    return encoded
+            self.counts["misses"] += 1
+            return None
+
+    def put(self, key, encoded):
+        with self.lock:
+            self.add_to_memory(key, encoded)
+            if self.folder is None or len(encoded) > self.max_disk_bytes:
+                return
+            temp = self.disk_path(key) + f".{os.getpid()}.tmp"
+            with open(temp, "wb") as f:
+                f.write(encoded)
+            os.replace(temp, self.disk_path(key))  # so readers never see half a file
+            self.disk_bytes += len(encoded) - self.disk.pop(key, 0)
+            self.disk[key] = len(encoded)
+            while self.disk_bytes > self.max_disk_bytes:
+                old_key, size = self.disk.popitem(last=False)
+                self.disk_bytes -= size
+                self.counts["disk_evictions"] += 1
+                try:
+                    os.remove(self.disk_path(old_key))
+                except OSError:
+                    pass
+
+    def add_to_memory(self, key, encoded):
+        if len(encoded) > self.max_bytes:
+            return
+        self.memory_bytes += len(encoded) - len(self.memory.pop(key, b""))
+        self.memory[key] = encoded
+        while len(self.memory) > self.max_items or self.memory_bytes > self.max_bytes:
+            old_key, old = self.memory.popitem(last=False)
+            self.memory_bytes -= len(old)
+            self.counts["memory_evictions"] += 1
+
+    def disk_path(self, key):
+        return os.path.join(self.folder, f"{key}.json")
+
+    def clear(self):
+        """
+        Empties the memory and disk cache, the counts are kept
+        """
+        with self.lock:
+            for key in list(self.disk.keys()):
+                try:
+                    os.remove(self.disk_path(key))
+                except OSError:
+                    pass
+            self.memory.clear()
+            self.disk.clear()
+            self.memory_bytes = self.disk_bytes = 0
+
+    def stats(self):
+        """
+        output
+        ------
+        stats: dict
+            Hits (from memory and from disk), misses and evictions so far, with how many
+            results and MB are cached in memory and on disk
+        """
+        with self.lock:
+            stats = dict(self.counts)
+            stats["hits"] = stats["memory_hits"] + stats["disk_hits"]
+            stats["memory_items"] = len(self.memory)
+            stats["memory_mb"] = self.memory_bytes / 2 ** 20
+            stats["disk_items"] = len(self.disk)
+            stats["disk_mb"] = self.disk_bytes / 2 ** 20
+        return stats
+
+
+def results_jsonified(results, first_sec, results_col, keep_score=False):
     """
     Converts timestamps to seconds, extracts results and makes the whole thing machine readable
 
@@ -296,6 +2000,8 @@ def results_jsonified(results, first_sec, results_col):
         The very first timestamp in the entire twitch chat log. Used to calculate elapsed time in seconds.
     results_col: str
         Column to sort values by (ascending=False)
+    keep_score: bool
+        True to also add each row's results_col value under a score key
 
     output
     ------
@@ -318,6 +2024,8 @@ def results_jsonified(results, first_sec, results_col):
         end_sec = dt.timedelta.total_seconds(end - og)
 
         dict_ = {"startTime": start_sec, "endTime": end_sec}
+        if keep_score:
+            dict_["score"] = float(row[results_col])
         json_results.append(dict_)
 
     return json_results
@@ -17,25 +17,33 @@ from pillaralgos.helpers import data_handler as dh
 
 
 class emoticonExtractor:
-    def __init__(self, data, min_use="mean", limit=None, save_csv=False):
+    def __init__(self, data, min_use="mean", limit=None, save_csv=False, vid_id=None):
         """
         Gets data ready for emo extraction. Initializes dicts, lists, etc.
 
         input
         -----
-        data: list
-            List of dictionaries, a json file opened with json.load(open(file))
+        data: list, pd.DataFrame or Arrow table
+            List of dictionaries, a json file opened with json.load(open(file)). Or the
+            same already organized, see `data_handler.ORGANIZED_SCHEMA`, with `emoticons`.
         min_use: str, int, None
             'mean': Return only those emoticons who's count is > the mean occurrance
             int: Return only those emoticons who's count is > X. Use 0 to not filter.
         limit: int, None
             int: Return only the top X emoticons (using df.head(X))
             None: Return all emoticons
+        vid_id: int, None
+            Id of the video, for the csv name. If None, taken from the messages'
+            `content_id` (or the df's `content_id` col, if any)
         """
 
         big_df = dh.organize_twitch_chat(data)
-        print(big_df.iloc[-1, 0] - big_df.iloc[0, 0])
-        self.vid_id = data[0]["content_id"]
+        print(big_df["created_at"].iloc[-1] - big_df["created_at"].iloc[0])
+        if vid_id is None and not dh.is_organized(data):
+            vid_id = data[0]["content_id"]
+        elif vid_id is None and "content_id" in big_df.columns:
+            vid_id = big_df["content_id"].iloc[0]
+        self.vid_id = vid_id
         self.big_df = big_df
         self.all_emos = (
             []
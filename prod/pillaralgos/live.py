@@ -0,0 +1,258 @@
+"""
+Finds highlights while the stream is still live. Chat messages are fed in batches as
+they come in, and the best clips so far of algo1, algo2 or algo3_5 can be asked for
+at any moment.
+
+Chunks are split the same way as `data_handler.chunk_bounds`, so once the stream is
+over (`close`) the clips and scores are the same as running the algos on the VOD
+(clips with the same score are in order of time).
+Only one row of counts is kept per chunk, plus the chatters of the current chunk,
+the current hour and the whole stream, so memory does not grow with the number of messages.
+With `precision`, the chatters are HyperLogLog sketches of a fixed size instead of sets.
+
+HOW TO
+```
+live_chat = live.liveChat(min_=2)
+live_chat.update(new_messages)  # list of dictionaries, same as algoX.run(data)
+live_chat.top("algo1", limit=10)
+```
+"""
+import numpy as np
+import pandas as pd
+from .helpers import data_handler as d
+
+HOUR_NS = pd.Timedelta(hours=1).value
+SUMS = ["messages", "num_words_emo", "num_emo", "num_words"]
+
+
+class liveChat:
+    def __init__(self, min_=2, precision=None):
+        """
+        ### Input
+        -----
+        ```
+        min_: int
+            Approximate number of minutes each clip should be
+        precision: int or None
+            If given, unique chatters are estimated with `data_handler.hllSketch`es of
+            2**precision bytes instead of kept in sets, see `data_handler.hll_count`
+        ```
+        """
+        self.min_ = min_
+        self.precision = precision
+        self.min_ns = pd.Timedelta(minutes=min_).value
+        self.first_stamp = None  # ns of the very first message
+        self.last_stamp = None  # ns of the newest message
+        self.late = 0  # messages older than the newest message when they came in, not used
+
+        # one row per finished chunk
+        self.chunks = {
+            col: [] for col in ["hour", "chunk", "start", "end", "num_unique"] + SUMS
+        }
+        self.hour_uniques = []  # unique chatters of each finished hour
+        self.chatters = self.new_chatters()  # every chatter of the stream
+
+        self.hour = None  # open hour: {"start", "chatters", "num_chunks"}
+        self.chunk = None  # open chunk: same keys as self.chunks + "chatters"
+
+    def update(self, data):
+        """
+        Adds a batch of new chat messages. Messages are put in order of `created_at`,
+        messages older than the newest one of an earlier batch are left out (`self.late`).
+
+        ### Input
+        -----
+        ```
+        data: list
+            List of dictionaries of new Twitch chat messages
+        ```
+        """
+        df = d.organize_twitch_chat(data)
+        if type(df) != pd.DataFrame:
+            return
+        df = df.sort_values("created_at", kind="mergesort")
+        stamps = df["created_at"].values.view("int64")
+        if self.last_stamp is not None:
+            on_time = stamps >= self.last_stamp
+            self.late += int((~on_time).sum())
+            df, stamps = df[on_time], stamps[on_time]
+        if len(stamps) < 1:
+            return
+        if self.first_stamp is None:
+            self.first_stamp = stamps[0]
+        self.last_stamp = stamps[-1]
+
+        ids = df["_id"].values
+        prefix = batch_prefix(df)
+        self.chatters.update(ids)
+
+        pos = 0
+        while pos < len(stamps):
+            if self.hour is None:
+                self.open_hour(stamps[pos])
+            hour_stop = np.searchsorted(stamps, self.hour["start"] + HOUR_NS, side="right")
+            chunk_stop = np.searchsorted(stamps, self.chunk["start"] + self.min_ns, side="right")
+            stop = max(min(hour_stop, chunk_stop), pos)
+            if stop > pos:
+                self.add_messages(ids[pos:stop], stamps[stop - 1], prefix, pos, stop)
+            pos = stop
+            if pos == len(stamps):
+                break
+            # the message at pos is too late for this hour, or for this chunk
+            if stamps[pos] > self.hour["start"] + HOUR_NS:
+                self.close_hour()
+            else:
+                self.close_chunk()
+                self.open_chunk(stamps[pos])
+
+    def close(self):
+        """
+        Closes the last hour once the stream is over, same as `data_handler.chunk_bounds`
+        does at the end of the chat
+        """
+        if self.hour is not None:
+            self.close_hour()
+
+    def top(
+        self,
+        algo="algo1",
+        limit=10,
+        sort_by="rel",
+        goal="num_words_emo",
+        scores=False,
+        include_open=True,
+    ):
+        """
+        Best clips so far, best first. Only the top `limit` chunks get sorted.
+
+        ### Input
+        -----
+        ```
+        algo: str
+            One of "algo1", "algo2", "algo3_5"
+        limit: int or None
+            Number of dictionaries/timestamps to return. If None, every chunk.
+        sort_by: str
+            Only for algo1, 'rel' or 'abs', see `algo1.run`
+        goal: str
+            Only for algo3_5, 'num_words', 'num_emo' or 'num_words_emo', see `algo3_5.run`
+        scores: bool
+            True to add each clip's score to its dictionary as `score`
+        include_open: bool
+            True to also rank the chunk that is still getting messages, with what it has so far
+        ```
+
+        ### Output
+        ------
+        ```
+        json_results: list
+            List of dictionaries in json format, ordered from predicted best to worst candidates.
+                Ex: [{startTime:float, endTime:float}]
+        ```
+        """
+        chunks = self.chunk_table(include_open)
+        if len(chunks["start"]) < 1:
+            return []
+        if algo == "algo1":
+            if sort_by == "rel":
+                score = chunks["num_unique"] / chunks["hour_unique"]
+            else:
+                score = chunks["num_unique"] / len(self.chatters)
+        elif algo == "algo2":
+            # same as algo2.thalamus
+            time_d = ((chunks["end"] - chunks["start"]) // 1000) / 10 ** 6
+            time_d = np.where(time_d == 0, self.min_, time_d)
+            score = (chunks["messages"] / chunks["num_unique"] / time_d) * 60 * self.min_
+        elif algo == "algo3_5":
+            score = chunks[goal]
+        else:
+            raise ValueError('algo must be one of "algo1", "algo2", "algo3_5"')
+
+        best = np.arange(len(score))
+        if limit and limit < len(score):
+            # partial sort: everything above the limit-th score, then the earliest ties of it
+            cutoff = np.partition(-score, limit - 1)[limit - 1]
+            above = np.nonzero(-score < cutoff)[0]
+            ties = np.nonzero(-score == cutoff)[0][: limit - len(above)]
+            best = np.sort(np.concatenate([above, ties]))
+        best = best[np.argsort(-score[best], kind="mergesort")]
+
+        json_results = []
+        for i in best:
+            dict_ = {
+                "startTime": (chunks["start"][i] - self.first_stamp) / 10 ** 9,
+                "endTime": (chunks["end"][i] - self.first_stamp) / 10 ** 9,
+            }
+            if scores:
+                dict_["score"] = float(score[i])
+            json_results.append(dict_)
+        return json_results
+
+    def chunk_table(self, include_open=True):
+        """
+        The counts of every finished chunk (and the open one) as np.arrays, with the
+        unique chatters of each chunk's hour as `hour_unique`
+        """
+        chunks = {col: list(values) for col, values in self.chunks.items()}
+        hour_uniques = list(self.hour_uniques)
+        if self.hour is not None:
+            hour_uniques.append(len(self.hour["chatters"]))
+            if include_open:
+                for col in chunks.keys():
+                    chunks[col].append(self.chunk_value(col))
+        chunks = {col: np.array(values) for col, values in chunks.items()}
+        chunks["hour_unique"] = np.array(hour_uniques)[chunks["hour"].astype(np.int64)]
+        return chunks
+
+    def chunk_value(self, col):
+        if col == "num_unique":
+            return len(self.chunk["chatters"])
+        return self.chunk[col]
+
+    def new_chatters(self):
+        if self.precision is None:
+            return set()
+        return d.hllSketch(self.precision)
+
+    def open_hour(self, stamp):
+        self.hour = {"start": stamp, "chatters": self.new_chatters(), "num_chunks": 0}
+        self.open_chunk(stamp)
+
+    def open_chunk(self, stamp):
+        self.chunk = {
+            "hour": len(self.hour_uniques),
+            "chunk": self.hour["num_chunks"],
+            "start": stamp,
+            "end": stamp,
+            "chatters": self.new_chatters(),
+        }
+        self.chunk.update({col: 0 for col in SUMS})
+        self.hour["num_chunks"] += 1
+
+    def add_messages(self, ids, end, prefix, start, stop):
+        self.chunk["chatters"].update(ids)
+        self.hour["chatters"].update(ids)
+        self.chunk["end"] = end
+        for col in SUMS:
+            self.chunk[col] += int(prefix[col][stop] - prefix[col][start])
+
+    def close_chunk(self):
+        for col in self.chunks.keys():
+            self.chunks[col].append(self.chunk_value(col))
+        self.chunk = None
+
+    def close_hour(self):
+        # like chunk_bounds, a last chunk that only has 1 message is left out
+        if self.chunk["chunk"] == 0 or self.chunk["messages"] > 1:
+            self.close_chunk()
+        self.chunk = None
+        self.hour_uniques.append(len(self.hour["chatters"]))
+        self.hour = None
+
+
+def batch_prefix(df):
+    """
+    Prefix sums of `data_handler.message_features` of a batch
+    """
+    features = d.message_features(df)
+    return {col: np.concatenate([[0], np.cumsum(features[col])]) for col in SUMS}
@@ -29,6 +29,7 @@ sys.path.append(algos_path)  # append the path to sys.path
 
 #### Testing Area ####
 from pillaralgos import algo1, algo2, algo3_0, algo3_5 # from pillaralgos folder
+from pillaralgos.helpers import data_handler as dh
 
 ###############################################################################
 
@@ -194,4 +195,220 @@ def test_algo35_diffs(med_file):
         
         all_results.append(result)
         
-    assert all_results[0] != all_results[1] != all_results[2] != all_results[3]
\ No newline at end of file
+    assert all_results[0] != all_results[1] != all_results[2] != all_results[3]
+
+def test_chat_frame_input(med_file):
+    '''
+    Test that every algo gets the same answer from a shared chatFrame as from
+    the raw list of dictionaries
+    '''
+    chat = dh.chatFrame(med_file)
+    for algo in [algo1, algo2, algo3_0, algo3_5]:
+        answer = algo.run(med_file, min_=1, limit=10)
+        calc_result = algo.run(chat, min_=1, limit=10)
+        assert calc_result == answer
+
+
+def test_sweep(med_file):
+    '''
+    Test one sweep gets the same answers as a run for each min_
+    '''
+    mins = [0.5, 1, 3]
+    for algo in [algo1, algo2, algo3_0, algo3_5]:
+        calc_result = algo.sweep(med_file, mins=mins, limit=5)
+        assert list(calc_result.keys()) == mins
+        for min_ in mins:
+            assert calc_result[min_] == algo.run(med_file, min_=min_, limit=5)
+
+
+def test_sliding_windows(med_file):
+    '''
+    Test overlapping windows are min_ long at most, and algo3_5 sums each window's messages
+    '''
+    min_ = 1
+    for algo in [algo1, algo2, algo3_5]:
+        calc_result = algo.run(med_file, min_=min_, limit=10, step=15)
+        assert len(calc_result) == 10
+        assert check_length(calc_result, min_=min_)
+
+    chat = dh.chatFrame(med_file)
+    first_sec, hour_bounds, bounds = chat.get_bounds(min_, step=15)
+    results, first_stamp = algo3_5.thalamus(chat.big_df, min_, goal="num_emo", bounds=(first_sec, hour_bounds, bounds))
+    num_emo = chat.big_df["emoticons"].apply(lambda x: len(x) if type(x) == list else 0)
+    answer = [num_emo.iloc[start:stop].sum() for hour, window, start, stop in bounds]
+    assert list(results.sort_index()["num_emo"]) == answer
+
+
+def test_algo1_precision(med_file):
+    '''
+    Test sketched unique chatters give about the same perc_rel_unique as exact counts,
+    without building the exact featureStore
+    '''
+    chat = dh.chatFrame(med_file)
+    bounds = chat.get_bounds(0.5)
+    approx = algo1.chunk_uniques(chat.big_df, bounds, 0.5, precision=12)
+    assert len(algo1.run(chat, min_=0.5, limit=10, precision=12)) == 10
+    assert chat.features == {}
+    exact = algo1.chunk_uniques(chat.big_df, bounds, 0.5, features=chat.get_features())
+    assert (np.abs(approx["num_unique"] - exact["num_unique"]) <= 0.05 * exact["num_unique"] + 1).all()
+    assert np.abs(approx["perc_rel_unique"] - exact["perc_rel_unique"]).mean() < 0.01
+
+
+def test_scores(med_file):
+    '''
+    Test scores=True only adds a score, in the same order the clips are ranked
+    '''
+    chat = dh.chatFrame(med_file)
+    for algo in [algo1, algo2, algo3_0, algo3_5]:
+        answer = algo.run(chat, min_=1, limit=10)
+        calc_result = algo.run(chat, min_=1, limit=10, scores=True)
+        assert [{k: v for k, v in clip.items() if k != "score"} for clip in calc_result] == answer
+        scores = [clip["score"] for clip in calc_result]
+        assert scores == sorted(scores, reverse=True)
+
+
+def test_cache(med_file, tmp_path):
+    '''
+    Test a cached run returns the same clips, from memory and then from the disk folder
+    '''
+    cache = dh.resultCache(folder=str(tmp_path))
+    for algo in [algo1, algo2, algo3_0, algo3_5]:
+        answer = algo.run(med_file, min_=1, limit=10)
+        assert algo.run(med_file, min_=1, limit=10, cache=cache) == answer
+        assert algo.run(med_file, min_=1, limit=10, cache=cache) == answer
+    assert cache.stats()["misses"] == 4 and cache.stats()["memory_hits"] == 4
+
+    new_cache = dh.resultCache(folder=str(tmp_path))
+    assert algo1.run(med_file, min_=1, limit=10, cache=new_cache) == algo1.run(med_file, min_=1, limit=10)
+    assert new_cache.stats()["disk_hits"] == 1
+    # different params, different key
+    algo1.run(med_file, min_=1, limit=5, cache=new_cache)
+    assert new_cache.stats()["misses"] == 1
+    # the frame cache is only where the chat is loaded from, same key
+    filename = f"{data_folder}/sample_med.json"
+    answer = algo1.run(filename, min_=1, limit=10, cache=new_cache)
+    frames = str(tmp_path / "frames")
+    assert algo1.run(filename, min_=1, limit=10, cache=new_cache, frame_cache=frames) == answer
+    assert new_cache.stats()["misses"] == 2
+
+
+def test_cache_save_json(med_file, tmp_path, monkeypatch):
+    '''
+    Test save_json still saves the clips when they come from the cache
+    '''
+    monkeypatch.chdir(tmp_path)
+    cache = dh.resultCache()
+    answer = algo3_5.run(med_file, min_=1, limit=10, cache=cache)
+    assert algo3_5.run(med_file, min_=1, limit=10, save_json=True, cache=cache) == answer
+    assert cache.stats()["memory_hits"] == 1
+    assert (tmp_path / "algo3.5_num_words_emo.json").exists()
+
+
+def test_compact(med_file):
+    '''
+    Test every algo ranks a compact chat the same as the full one
+    '''
+    chat = dh.chatFrame(med_file)
+    compact = dh.chatFrame(med_file, compact=True)
+    for algo in [algo1, algo2, algo3_0, algo3_5]:
+        assert algo.run(compact, min_=1, limit=None) == algo.run(chat, min_=1, limit=None)
+
+
+def test_dataframe_input(med_file):
+    '''
+    Test every algo gets the same clips from an organized df as from the list
+    '''
+    big_df = dh.organize_twitch_chat(med_file)
+    for algo in [algo1, algo2, algo3_0, algo3_5]:
+        assert algo.run(big_df, min_=1, limit=None) == algo.run(med_file, min_=1, limit=None)
+    # created_at as the raw twitch strings, ex: a df read from csv
+    str_df = big_df.assign(created_at=[clip["created_at"] for clip in med_file])
+    for algo in [algo1, algo2, algo3_0, algo3_5]:
+        assert algo.run(str_df, min_=1, limit=None) == algo.run(med_file, min_=1, limit=None)
+
+
+def test_algo1_chunk_uniques(med_file):
+    '''
+    Test the featureStore unique chatters match counting each chunk and hour on its own
+    '''
+    min_ = 0.5
+    chat = dh.chatFrame(med_file)
+    first_sec, hour_bounds, chunk_bounds = chat.get_bounds(min_)
+    calc_result = algo1.chunk_uniques(chat.big_df, chat.get_bounds(min_), min_)
+    ids = chat.big_df["_id"]
+    hour_uniques = [ids.iloc[start:stop].nunique() for start, stop in hour_bounds]
+    for i, (hour, chunk, start, stop) in enumerate(chunk_bounds):
+        num_unique = ids.iloc[start:stop].nunique()
+        assert calc_result.loc[i, "num_unique"] == num_unique
+        assert calc_result.loc[i, "perc_rel_unique"] == num_unique / hour_uniques[hour]
+        assert calc_result.loc[i, "perc_abs_unique"] == num_unique / ids.nunique()
+
+
+def test_algo2_thalamus():
+    '''
+    Test the mean chat rate per user, including a chunk with only 1 timestamp
+    '''
+    stamp = pd.Timestamp("2021-04-10 08:00:00")
+    big_df = pd.DataFrame(
+        {
+            "created_at": [stamp + pd.Timedelta(seconds=s) for s in [0, 30, 60, 200, 200]],
+            "_id": [1, 2, 1, 3, 4],
+            "body": ["a"] * 5,
+            "emoticons": [[]] * 5,
+        }
+    )
+    results, first_stamp = algo2.thalamus(big_df, min_=2)
+    # 3 messages from 2 users in 60 sec, then 2 users at 1 timestamp assumed to take 2 min
+    assert list(results["chats_per_2min"]) == [60.0, (3 / 2 / 60) * 60 * 2]  # sorted
+    assert first_stamp == stamp
+
+
+def test_algo3_0_participation(med_file):
+    '''
+    Test the sparse participation matrix counts every chunked message once
+    '''
+    chat = dh.chatFrame(med_file)
+    first_stamp, hour_bounds, chunk_bounds = chat.get_bounds(0.5)
+    participation = algo3_0.participation_matrix(chat.big_df, chunk_bounds)
+    assert participation.sum() == (chunk_bounds[:, 3] - chunk_bounds[:, 2]).sum()
+    assert (participation > 0).all()
+
+
+def test_algo3_0_id_words(med_file):
+    '''
+    Test the words per user from a featureStore match counting them from big_df
+    '''
+    chat = dh.chatFrame(med_file)
+    answer = algo3_0.id_words_counter(chat.big_df)
+    calc_result = algo3_0.id_words_counter(chat.big_df, chat.get_features())
+    pd.testing.assert_frame_equal(calc_result, answer)
+
+
+def test_algo3_0_top_n(med_file):
+    '''
+    Test top_n=10 is the default, and more top users can only add chunks
+    '''
+    answer = algo3_0.run(med_file, min_=0.5, limit=None, min_words=10)
+    calc_result = algo3_0.run(med_file, min_=0.5, limit=None, min_words=10, top_n=10)
+    assert calc_result == answer
+    calc_result = algo3_0.run(med_file, min_=0.5, limit=None, min_words=10, top_n=100)
+    assert len(calc_result) >= len(answer)
+
+
+def test_algo3_5_thalamus():
+    '''
+    Test chunks of different hours stay separate, summed and sorted by goal
+    '''
+    stamp = pd.Timestamp("2021-04-10 08:00:00")
+    big_df = pd.DataFrame(
+        {
+            "created_at": [stamp + pd.Timedelta(seconds=s) for s in [0, 10, 40000, 40010]],
+            "_id": [1, 2, 1, 2],
+            "body": ["a", "a b", "a", "a"],
+            "emoticons": [[1], [1, 2], [1, 2, 3], [1, 2, 3, 4, 5]],
+        }
+    )
+    results, first_stamp = algo3_5.thalamus(big_df, min_=2, goal="num_emo")
+    assert list(results["num_emo"]) == [8, 3]
+    assert list(results["start"]) == [big_df.loc[2, "created_at"], stamp]
+    assert list(results["end"]) == [big_df.loc[3, "created_at"], big_df.loc[1, "created_at"]]
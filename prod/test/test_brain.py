@@ -27,6 +27,7 @@ sys.path.append(algos_path)  # append the path to sys.path
 
 #### Testing Area ####
 from pillaralgos import brain # from pillaralgos folder
+from pillaralgos.helpers import data_handler as dh
 
 ###############################################################################
 import pytest
@@ -75,4 +76,150 @@ def test_length(med_file):
         num_sec = clip_length*60 
         result = time_diff <= num_sec # to get bools
         lengths.append(result)
-    assert sum(lengths) == 7 # passes if all time lengths <= clip_length
\ No newline at end of file
+    assert sum(lengths) == 7 # passes if all time lengths <= clip_length
+
+
+def test_executors(med_file):
+    '''
+    Checks running the algos in threads or processes gets the same answer as serial
+    '''
+    answer = brain.run(data=med_file, clip_length=0.75, common_timestamps=2, limit=7)
+    for executor in ["threads", "processes"]:
+        calc_result = brain.run(
+            data=med_file,
+            clip_length=0.75,
+            common_timestamps=2,
+            limit=7,
+            executor=executor,
+            workers=2,
+        )
+        assert calc_result == answer
+
+
+def test_cache(med_file):
+    '''
+    Checks the executor and workers are not part of the cache key
+    '''
+    cache = dh.resultCache()
+    answer = brain.run(data=med_file, clip_length=0.75, limit=7, cache=cache)
+    calc_result = brain.run(
+        data=med_file, clip_length=0.75, limit=7, executor="threads", workers=2, cache=cache
+    )
+    assert calc_result == answer
+    assert cache.stats()["misses"] == 1 and cache.stats()["memory_hits"] == 1
+
+
+def test_bad_mode(monkeypatch):
+    '''
+    Checks an unknown mode or fusion method is refused before any algo runs
+    '''
+    monkeypatch.setattr(brain, "run_algos", None)  # would raise TypeError if called
+    with pytest.raises(ValueError):
+        brain.run(data=[], clip_length=2, mode="median")
+    with pytest.raises(ValueError):
+        brain.run(data=[], clip_length=2, mode="fusion", fusion="borda", cache=dh.resultCache())
+
+
+def test_consensus():
+    '''
+    Checks only startTimes returned by enough algos are kept, in order, without duplicates
+    '''
+    results = [
+        [{'startTime': 10.0, 'endTime': 40.0}, {'startTime': 50.0, 'endTime': 90.0}],
+        [{'startTime': 50.0, 'endTime': 90.0}, {'startTime': 10.0, 'endTime': 45.0}],
+        [{'startTime': 70.0, 'endTime': 99.0}],
+        [],
+    ]
+    answer = [{'startTime': 10.0, 'endTime': 40.0},
+              {'startTime': 50.0, 'endTime': 90.0},
+              {'startTime': 10.0, 'endTime': 45.0}]
+    assert brain.consensus(results, common_timestamps=2) == answer
+    assert brain.consensus(results, common_timestamps=3) == []
+    assert brain.consensus([[], []], common_timestamps=2) == []
+
+
+def test_no_common(med_file):
+    '''
+    Checks an empty list is returned when no timestamp is shared by enough algos
+    '''
+    calc_result = brain.run(data=med_file, clip_length=0.75, common_timestamps=100)
+    assert calc_result == []
+
+
+def test_overlap_consensus():
+    '''
+    Checks overlapping clips of different algos are merged, and one algo's own overlaps count once
+    '''
+    results = [
+        [{'startTime': 0.0, 'endTime': 10.0}, {'startTime': 5.0, 'endTime': 12.0},
+         {'startTime': 30.0, 'endTime': 40.0}],
+        [{'startTime': 8.0, 'endTime': 20.0}, {'startTime': 35.0, 'endTime': 50.0}],
+        [{'startTime': 9.0, 'endTime': 11.0}, {'startTime': 40.0, 'endTime': 41.0}],
+        [],
+    ]
+    answer = [{'startTime': 8.0, 'endTime': 12.0},
+              {'startTime': 35.0, 'endTime': 41.0}]
+    assert brain.overlap_consensus(results, common_timestamps=2) == answer
+    assert brain.overlap_consensus(results, common_timestamps=3) == [{'startTime': 9.0, 'endTime': 11.0}]
+    assert brain.overlap_consensus(results, common_timestamps=2, min_overlap=5) == answer[1:]
+    assert brain.overlap_consensus(results, common_timestamps=5) == []
+
+
+def test_overlap_mode(med_file):
+    '''
+    Checks overlap mode returns non empty stretches
+    '''
+    calc_result = brain.run(data=med_file, clip_length=0.75, common_timestamps=3,
+                            mode="overlap", candidates=30)
+    assert len(calc_result) > 0
+    for clip in calc_result:
+        assert clip['endTime'] > clip['startTime']
+
+
+def test_fusion_consensus():
+    '''
+    Checks slots are ranked by fused rank or score, and top_k keeps only the best
+    '''
+    results = [
+        [{'startTime': 0.0, 'endTime': 60.0, 'score': 5.0},
+         {'startTime': 90.0, 'endTime': 150.0, 'score': 3.0}],
+        [{'startTime': 100.0, 'endTime': 130.0, 'score': 9.0},
+         {'startTime': 0.0, 'endTime': 60.0, 'score': 1.0}],
+        [],
+    ]
+    answer = [{'startTime': 0.0, 'endTime': 60.0},
+              {'startTime': 60.0, 'endTime': 120.0},
+              {'startTime': 120.0, 'endTime': 180.0}]
+    assert brain.fusion_consensus(results, grid=60) == answer
+    assert brain.fusion_consensus(results, grid=60, top_k=2) == answer[:2]
+    # normalized scores: the lowest clip of each algo adds nothing
+    assert brain.fusion_consensus(results, grid=60, method="score") == answer
+
+
+def test_fusion_mode(med_file):
+    '''
+    Checks fusion mode returns `limit` slots of clip_length
+    '''
+    calc_result = brain.run(data=med_file, clip_length=0.75, mode="fusion", candidates=None, limit=5)
+    assert len(calc_result) == 5
+    for clip in calc_result:
+        assert clip['endTime'] - clip['startTime'] == 45
+
+
+def test_profile(med_file):
+    '''
+    Checks profile=True returns the stages of the run along with the same results
+    '''
+    answer = brain.run(data=med_file, clip_length=2, limit=5)
+    calc_result, stages = brain.run(data=med_file, clip_length=2, limit=5, profile=True)
+    assert calc_result == answer
+
+    names = [stage["stage"] for stage in stages]
+    for name in ["organize_twitch_chat", "chunk_bounds", "featureStore", "algo1.chunk_uniques",
+                 "algo2.thalamus", "algo3_0.top_user_chunks", "algo3_5.results_jsonified",
+                 "brain.run_algos", "brain.exact_consensus"]:
+        assert name in names
+    by_name = {stage["stage"]: stage for stage in stages}
+    assert by_name["algo1.run"]["parent"] == "brain.run_algos"
+    assert by_name["organize_twitch_chat"]["rows"] == len(med_file)
+    assert all(stage["seconds"] >= 0 for stage in stages)
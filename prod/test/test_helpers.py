@@ -9,6 +9,7 @@ import pytest  # test
 import pandas.api.types as ptypes  # to check dataframe dtypes assertions
 import pandas as pd
 import numpy as np
+import tracemalloc  # to check the profiler stops tracing
 
 
 #### Grab Directory Locations ####
@@ -106,6 +107,131 @@ def test_organize_twitch_chat_dtypes(med_file):
     assert all(ptypes.is_object_dtype(data[col]) for col in obj_cols)
 
 
+def test_organize_twitch_chat_columnar(med_file):
+    "Checks the columnar extractor returns the same df as dictExtractor"
+    for keep_user_vars in [False, True]:
+        calc_result = dh.organize_twitch_chat(med_file, keep_user_vars, columnar=True)
+        answer = dh.organize_twitch_chat(med_file, keep_user_vars, columnar=False)
+        pd.testing.assert_frame_equal(calc_result, answer)
+
+
+def test_organize_twitch_chat_columns(med_file):
+    "Checks only the asked for columns are kept, with the same values"
+    cols = ["created_at", "_id", "body"]
+    answer = dh.organize_twitch_chat(med_file)[cols]
+    for columnar in [True, False]:
+        calc_result = dh.organize_twitch_chat(med_file, columnar=columnar, columns=cols)
+        pd.testing.assert_frame_equal(calc_result, answer)
+
+
+def test_parse_timestamps(med_file):
+    "Checks the fixed layout parse matches pd.to_datetime, and odd strings still go through it"
+    stamps = [row["created_at"] for row in med_file] + [
+        row["commenter"]["created_at"] for row in med_file
+    ]
+    answer = pd.to_datetime(pd.Series(stamps)).dt.tz_localize(None).values
+    assert (dh.parse_timestamps(stamps) == answer).all()
+
+    odd = [
+        "2021-02-20T21:17:49Z",
+        "2020-02-29T00:00:00.123456789Z",
+        "2021-02-20T21:17:49.708+02:00",
+        "2021-02-20 21:17:49",
+        np.nan,
+    ]
+    answer = pd.to_datetime(pd.Series(odd), utc=True).dt.tz_localize(None).values
+    calc_result = dh.parse_timestamps(odd)
+    assert ((calc_result == answer) | np.isnat(answer)).all()
+    assert np.isnat(calc_result[-1])
+    for bad in ["2021-02-30T00:00:00Z", "2021-13-01T00:00:00Z", "not a time"]:
+        with pytest.raises(ValueError):
+            dh.parse_timestamps([bad])
+
+
+def test_stream_twitch_chat(med_file):
+    "Checks the streaming loader gets the same values as organize_twitch_chat"
+    answer = dh.organize_twitch_chat(med_file)
+    for chunk_size in [100, 2 ** 16]:
+        calc_result = dh.stream_twitch_chat(
+            f"{data_folder}/sample_med.json", chunk_size=chunk_size
+        )
+        pd.testing.assert_frame_equal(calc_result, answer[calc_result.columns])
+
+
+def test_stream_twitch_chat_empty():
+    data = dh.stream_twitch_chat(f"{data_folder}/sample_nan.json")
+    assert data.size == 0
+
+
+def test_organized_frame(med_file):
+    "Checks an organized df is used as is, fixed if its dtypes are off, refused if missing columns"
+    answer = dh.chatFrame(med_file).big_df
+    assert dh.chatFrame(answer).big_df is answer
+    assert dh.organize_twitch_chat(answer) is answer
+
+    off = answer.assign(
+        created_at=answer["created_at"].dt.tz_localize("UTC").dt.tz_convert("US/Eastern"),
+        _id=answer["_id"].astype(str),
+    )
+    pd.testing.assert_frame_equal(dh.organized_frame(off), answer)
+    as_str = answer.assign(created_at=answer["created_at"].dt.strftime("%Y-%m-%dT%H:%M:%S.%fZ"))
+    pd.testing.assert_frame_equal(dh.organized_frame(as_str), answer)
+    with pytest.raises(ValueError):
+        dh.organized_frame(answer.drop(columns=["body"]))
+
+
+def test_arrow_input(med_file):
+    "Checks an Arrow table gets the same df as the list"
+    pa = pytest.importorskip("pyarrow")
+    answer = dh.chatFrame(med_file).big_df
+    table = pa.Table.from_pandas(answer[["created_at", "_id", "body"]])
+    calc_result = dh.chatFrame(table).big_df
+    pd.testing.assert_frame_equal(calc_result, answer[["created_at", "_id", "body"]])
+
+
+def test_save_frame(med_file, tmp_path):
+    "Checks a saved frame loads back with the same values and dtypes, memory mapped"
+    answer = dh.organize_twitch_chat(med_file, keep_user_vars=True)
+    folder = str(tmp_path / "frame")
+    dh.save_frame(answer, folder)
+    dh.save_frame(answer, folder)  # replaces the old one
+    calc_result = dh.load_frame(folder)
+    pd.testing.assert_frame_equal(calc_result, answer.reset_index(drop=True))
+    assert isinstance(calc_result["_id"].values.base, np.memmap)
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_frame_cache(tmp_path):
+    "Checks a chat file is organized once, then loaded from the frame cache"
+    filename = f"{data_folder}/sample_med.json"
+    answer = dh.chatFrame(filename)
+    first = dh.chatFrame(filename, frame_cache=str(tmp_path), profile=True)
+    second = dh.chatFrame(filename, frame_cache=str(tmp_path), profile=True)
+    assert "save_frame" in [stage["stage"] for stage in first.profiler.report()]
+    assert [stage["stage"] for stage in second.profiler.report()] == ["load_frame"]
+    pd.testing.assert_frame_equal(second.big_df, answer.big_df)
+    assert dh.chatFrame(f"{data_folder}/sample_nan.json", frame_cache=str(tmp_path)).empty
+    assert dh.chatFrame(f"{data_folder}/sample_nan.json", frame_cache=str(tmp_path)).empty
+
+
+def test_compact_frame(med_file):
+    "Checks compact chats keep the chatters and counts in narrow dtypes, and take less memory"
+    chat = dh.chatFrame(med_file)
+    compact = dh.chatFrame(med_file, compact=True)
+    assert list(compact.big_df.columns) == ["created_at", "_id", "num_words_emo", "num_emo"]
+    assert compact.big_df["_id"].dtype == np.int32
+    assert compact.big_df["num_emo"].dtype.itemsize <= 2
+    assert all(compact.chatter_ids[compact.big_df["_id"].values] == chat.big_df["_id"].values)
+    answer = dh.message_features(chat.big_df)
+    calc_result = dh.message_features(compact.big_df)
+    for col in answer:
+        assert all(calc_result[col] == answer[col])
+    assert compact.memory_usage()["total"] * 10 < chat.memory_usage()["total"]
+
+    assert dh.narrow_int([0, 127]).dtype == np.int8
+    assert dh.narrow_int([-1, 40000]).dtype == np.int32
+
+
 def test_results_jsonified(med_file_results_df, med_file_results_json):
     'Compares calculated json from "sample_med_resultsdf.csv" to stored results'
     col = "perc_rel_unique"
@@ -119,6 +245,259 @@ def test_chunker():
     "future site of testing minute chunker and hour splitter"
 
 
+def test_chunk_bounds(med_file):
+    "Checks chunk_bounds finds the same splits as the dfSplitter and xminChats classes"
+    chat = dh.chatFrame(med_file)
+    for min_ in [0.5, 2]:
+        dhs = dh.dfSplitter(chat.big_df)
+        dhs.find_rest()
+        hour_list = dhs.result[1:]
+        answer = []
+        for i in range(len(hour_list)):
+            dhx = dh.xminChats(hour_list[i], 0, min_=min_)
+            dhx.find_rest()
+            for x in range(len(dhx.result)):
+                chunk = dhx.result[x]
+                answer.append([i, x, chunk.index.min(), chunk.index.max() + 1])
+
+        first_stamp, hour_bounds, bounds = chat.get_bounds(min_)
+        assert first_stamp == dhs.result[0]
+        assert [[h.index.min(), h.index.max() + 1] for h in hour_list] == hour_bounds.tolist()
+        assert answer == bounds.tolist()
+
+
+def test_get_chunks(med_file):
+    "Checks get_chunks slices chunks that start and end on the bounds"
+    chat = dh.chatFrame(med_file)
+    first_stamp, hour_bounds, bounds = dh.get_chunks(chat.big_df, min_=0.01, offsets=True)
+    first_stamp, chunk_list = dh.get_chunks(chat.big_df, min_=0.01)
+    assert len(chunk_list) == len(bounds)  # more chunks than the recursion limit
+    for chunk, (hour, x, start, stop) in zip(chunk_list, bounds):
+        assert len(chunk) == stop - start
+        assert (chunk["hour"] == hour).all() and (chunk["chunk"] == x).all()
+
+
+def test_get_chunks_labeled(med_file):
+    "Checks the labeled chunk df has the same rows as the list of chunks"
+    chat = dh.chatFrame(med_file)
+    first_stamp, chunk_list = dh.get_chunks(chat.big_df, min_=2)
+    calc_stamp, chunk_df, offsets = dh.get_chunks(chat.big_df, min_=2, labeled=True)
+    assert calc_stamp == first_stamp
+    assert len(offsets) == len(chunk_list)
+    pd.testing.assert_frame_equal(chunk_df, pd.concat(chunk_list))
+    for chunk, (start, stop) in zip(chunk_list, offsets):
+        pd.testing.assert_frame_equal(chunk_df.iloc[start:stop], chunk)
+
+
+def test_chat_frame(med_file):
+    "Checks chatFrame sorts the organized df and caches bounds per min_"
+    chat = dh.chatFrame(med_file)
+    assert chat.big_df["created_at"].is_monotonic_increasing
+    assert len(chat.timestamps) == len(med_file)
+    assert chat.get_bounds(2) is chat.get_bounds(2)
+    # runs only organize what the algos read, updated_at is never parsed
+    run_chat = dh.get_chat(med_file)
+    assert list(run_chat.big_df.columns) == dh.COMPACT_COLUMNS
+    assert "updated_at" in chat.big_df.columns
+    pd.testing.assert_frame_equal(run_chat.big_df, chat.big_df[dh.COMPACT_COLUMNS])
+
+
+def test_chat_frame_empty(empty_file):
+    chat = dh.chatFrame(empty_file)
+    assert chat.empty
+
+
+def test_feature_store(med_file):
+    '''
+    Sums and unique chatters of chunks and bins match counting the messages directly
+    '''
+    chat = dh.chatFrame(med_file)
+    big_df = chat.big_df
+    first_sec, hour_bounds, bounds = chat.get_bounds(0.5)
+    features = chat.get_features()
+    assert features is chat.get_features()  # only found once
+
+    num_emo = big_df["emoticons"].apply(lambda x: len(x) if type(x) == list else 0)
+    calc_uniques = features.uniques(bounds[:, 2], bounds[:, 3])
+    calc_emo = features.sums("num_emo", bounds[:, 2], bounds[:, 3])
+    for i, (hour, chunk, start, stop) in enumerate(bounds):
+        assert calc_uniques[i] == big_df["_id"].iloc[start:stop].nunique()
+        assert calc_emo[i] == num_emo.iloc[start:stop].sum()
+
+    features = chat.get_features(bin_sec=60)
+    elapsed = (big_df["created_at"] - big_df["created_at"].iloc[0]).dt.total_seconds()
+    first_bins = np.array([0, 3, 10, 10])
+    stop_bins = np.array([5, 60, 11, features.num_bins])
+    calc_uniques = features.bin_uniques(first_bins, stop_bins)
+    calc_words = features.bin_sums("num_words_emo", first_bins, stop_bins)
+    for i in range(len(first_bins)):
+        window = big_df[(elapsed >= first_bins[i] * 60) & (elapsed < stop_bins[i] * 60)]
+        assert calc_uniques[i] == window["_id"].nunique()
+        assert calc_words[i] == window["body"].str.split(" ").apply(len).sum()
+
+
+def test_sliding_bounds(med_file):
+    '''
+    Windows match filtering the messages of every step, and overlapping windows count
+    unique chatters like a direct count
+    '''
+    min_, step = 1, 20
+    chat = dh.chatFrame(med_file)
+    stamps = chat.big_df["created_at"]
+    first_sec, hour_bounds, bounds = chat.get_bounds(min_, step=step)
+    assert bounds is chat.get_bounds(min_, step=step)[2]  # only found once
+    assert (np.diff(bounds[:, 2]) >= 0).all() and (np.diff(bounds[:, 3]) >= 0).all()
+    answer = []
+    window_start = first_sec
+    while window_start <= stamps.iloc[-1]:
+        in_window = np.nonzero(
+            ((stamps >= window_start) & (stamps <= window_start + pd.Timedelta(minutes=min_))).values
+        )[0]
+        if len(in_window) and (not answer or answer[-1] != [in_window[0], in_window[-1] + 1]):
+            answer.append([in_window[0], in_window[-1] + 1])
+        window_start += pd.Timedelta(seconds=step)
+    assert bounds[:, 2:].tolist() == answer
+    for hour, window, start, stop in bounds:
+        assert hour_bounds[hour, 0] <= start < hour_bounds[hour, 1]
+
+    calc_result = chat.get_features().uniques(bounds[:, 2], bounds[:, 3])
+    answer = [chat.big_df["_id"].iloc[start:stop].nunique() for hour, window, start, stop in bounds]
+    assert list(calc_result) == answer
+
+
+def test_hll_sketch():
+    '''
+    Estimated counts stay within 3 standard errors (1.04/sqrt(2**precision)) of the real count
+    '''
+    for precision in [8, 12, 14]:
+        error = 1.04 / np.sqrt(2 ** precision)
+        for n in [10, 1000, 100000]:
+            sketch = dh.hllSketch(precision)
+            sketch.update([f"chatter{i}" for i in range(n)])
+            sketch.update([f"chatter{i}" for i in range(n // 2)])  # repeats don't count
+            assert abs(len(sketch) / n - 1) <= 3 * error
+
+    halves = [dh.hllSketch(12), dh.hllSketch(12)]
+    halves[0].update(range(0, 6000))
+    halves[1].update(range(4000, 10000))
+    halves[0].merge(halves[1])
+    assert abs(len(halves[0]) / 10000 - 1) <= 3 * 1.04 / np.sqrt(2 ** 12)
+
+
+def test_sketch_store(med_file):
+    '''
+    Sketched unique chatters of chunks, hours and the stream are close to the exact counts,
+    and the same as one hllSketch of each window's chatters whatever the bin size
+    '''
+    chat = dh.chatFrame(med_file)
+    features = chat.get_features()
+    first_sec, hour_bounds, bounds = chat.get_bounds(0.5)
+    error = 1.04 / np.sqrt(2 ** 12)
+    sketches = dh.sketchStore(chat.big_df, precision=12)
+    for starts, stops in [(bounds[:, 2], bounds[:, 3]), (hour_bounds[:, 0], hour_bounds[:, 1])]:
+        exact = features.uniques(starts, stops)
+        approx = sketches.uniques(starts, stops)
+        assert (np.abs(approx - exact) <= 3 * error * exact + 1).all()
+        assert np.abs(approx / exact - 1).mean() <= error
+    approx = sketches.uniques([0], [len(chat.big_df)])[0]
+    assert abs(approx / features.num_chatters - 1) <= 3 * error
+
+    ids = chat.big_df["_id"].values
+    starts, stops = [0, 10, 500, 7], [len(ids), 10, 4000, len(ids) - 3]
+    answer = []
+    for start, stop in zip(starts, stops):
+        sketch = dh.hllSketch(8)
+        sketch.update(ids[start:stop])
+        answer.append(dh.hll_count(sketch.registers))
+    for bin_sec in [1, 600]:
+        calc_result = dh.sketchStore(chat.big_df, precision=8, bin_sec=bin_sec).uniques(starts, stops)
+        assert np.allclose(calc_result, answer)
+
+def test_stage_profiler():
+    """
+    Checks nested stages are recorded with their parent, and sent to the callback as they end
+    """
+    seen = []
+    profiler = dh.stageProfiler(memory=True, callback=seen.append)
+    with profiler.stage("outer", rows=3):
+        with profiler.stage("inner"):
+            big = np.ones(2 ** 20)
+        del big
+    stages = profiler.report()
+
+    assert [stage["stage"] for stage in stages] == ["inner", "outer"]
+    assert seen == stages
+    inner, outer = stages
+    assert inner["parent"] == "outer" and inner["depth"] == 1
+    assert outer["parent"] is None and outer["rows"] == 3
+    assert outer["seconds"] >= inner["seconds"] >= 0
+    assert inner["alloc_mb"] >= 7.9  # 8 MB array still alive
+    assert outer["peak_mb"] >= inner["peak_mb"] >= 7.9
+    assert outer["alloc_mb"] < 1  # freed before outer ended
+    with profiler.stage("after"):
+        small = np.ones(8)
+    assert profiler.report()[-1]["peak_mb"] < 1  # the peak of outer is not carried over
+    profiler.close()
+    assert not tracemalloc.is_tracing()  # later runs aren't traced
+
+    assert dh.get_profiler(None) is None
+    assert dh.get_profiler(profiler) is profiler
+    with dh.profile_stage(None, "nothing"):
+        pass
+
+
+def test_stage_profiler_nested_free():
+    """
+    Checks a stage that frees what its parent allocated, the parent's memory is the net change
+    """
+    with dh.stageProfiler(memory=True) as profiler:
+        with profiler.stage("outer"):
+            big = np.ones(50 * 2 ** 17)  # 50 MB
+            with profiler.stage("inner"):
+                del big
+                small = np.ones(10 * 2 ** 17)  # 10 MB
+    assert not tracemalloc.is_tracing()
+    inner, outer = profiler.report()
+    assert abs(inner["alloc_mb"] + 40) < 1
+    assert abs(outer["alloc_mb"] - 10) < 1
+    if hasattr(tracemalloc, "reset_peak"):
+        assert abs(outer["peak_mb"] - 50) < 1
+        assert inner["peak_mb"] < 1
+
+
+def test_result_cache(med_file, tmp_path):
+    """
+    Checks the least recently used results are evicted from memory and disk, and the counts
+    """
+    calls = []
+
+    def fctn(data, n=0):
+        calls.append(n)
+        return [n] * 700
+
+    # each result is about 2 KB of json, so the disk keeps 2 of them
+    cache = dh.resultCache(max_items=2, folder=str(tmp_path), max_disk_mb=0.005)
+    for n in [0, 1, 0, 2, 1, 0]:
+        assert cache.run(fctn, med_file, n=n) == [n] * 700
+    # 0 and 1 are new, 0 from memory, 2 is new and evicts 1 from memory and 0 from disk,
+    # 1 from disk evicts 0 from memory, 0 is new again
+    assert calls == [0, 1, 2, 0]
+    stats = cache.stats()
+    assert stats["misses"] == 4 and stats["memory_hits"] == 1 and stats["disk_hits"] == 1
+    assert stats["memory_items"] == 2 and stats["memory_evictions"] == 3
+    assert stats["disk_items"] == 2 and stats["disk_evictions"] == 2
+    assert sorted(path.suffix for path in tmp_path.iterdir()) == [".json", ".json"]
+    # other files in the folder are never read or evicted
+    (tmp_path / "notes.json").write_text("[]")
+    assert len(dh.resultCache(folder=str(tmp_path)).disk) == 2
+    (tmp_path / "notes.json").unlink()
+
+    assert dh.data_hash(med_file) == dh.data_hash(list(med_file))
+    assert dh.data_hash(med_file) != dh.data_hash(med_file[:-1])
+    cache.clear()
+    assert len(list(tmp_path.iterdir())) == 0
+
+
 def test_emoji_getter(lg_file):
     ee = eg.emoticonExtractor(data=lg_file, min_use="mean", limit=None)
     calc_result = ee.run()
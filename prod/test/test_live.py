@@ -0,0 +1,96 @@
+'''
+Tests to make sure the live engine gets the same results as the algos on the whole chat.
+
+[Navigation source](https://towardsdatascience.com/pytest-for-data-scientists-2990319e55e6)
+'''
+import os.path  # get dir path
+import sys  # append dir path to sys.path
+import json  # load sample data
+import pytest  # test
+
+
+#### Grab Directory Locations ####
+cd = os.path.pardir  # go back one dir
+current_dir = os.path.dirname(__file__)  # get dir of current filename
+prod_dir = os.path.join(current_dir, cd)  # join it with cd to go to parent
+
+algos_path = os.path.abspath(prod_dir)  # get the absolute path
+
+data_folder = "sample_data"  # location of sample data
+
+#### Append Algos Dir to Sys.path ####
+sys.path.append(algos_path)  # append the path to sys.path
+
+#### Testing Area ####
+from pillaralgos import live, algo1, algo2, algo3_5 # from pillaralgos folder
+
+###############################################################################
+
+
+@pytest.fixture()
+def med_file():
+    data = json.load(open(f"{data_folder}/sample_med.json"))
+    return data
+
+
+def same_clips(calc_result, answer):
+    '''
+    Same scores in the same order, and the same clips. Clips with equal scores can be
+    in a different order.
+    '''
+    scores = [clip['score'] for clip in calc_result] == [clip['score'] for clip in answer]
+    clips = sorted(map(str, calc_result)) == sorted(map(str, answer))
+    return scores and clips
+
+
+def test_live_batches(med_file):
+    '''
+    Checks feeding the chat in batches gets the same clips and scores as each algo's run
+    '''
+    min_ = 0.5
+    live_chat = live.liveChat(min_=min_)
+    for i in range(0, len(med_file), 500):
+        live_chat.update(med_file[i : i + 500])
+    live_chat.close()
+
+    for sort_by in ['rel', 'abs']:
+        answer = algo1.run(med_file, min_=min_, limit=None, sort_by=sort_by, scores=True)
+        assert same_clips(live_chat.top('algo1', limit=None, sort_by=sort_by, scores=True), answer)
+    answer = algo2.run(med_file, min_=min_, limit=None, scores=True)
+    assert same_clips(live_chat.top('algo2', limit=None, scores=True), answer)
+    for goal in ['num_words', 'num_emo', 'num_words_emo']:
+        answer = algo3_5.run(med_file, min_=min_, limit=None, goal=goal, scores=True)
+        assert same_clips(live_chat.top('algo3_5', limit=None, goal=goal, scores=True), answer)
+
+
+def test_live_precision(med_file):
+    '''
+    Checks sketched chatters give about the same counts as sets
+    '''
+    exact = live.liveChat(min_=1)
+    approx = live.liveChat(min_=1, precision=12)
+    for i in range(0, len(med_file), 1000):
+        exact.update(med_file[i : i + 1000])
+        approx.update(med_file[i : i + 1000])
+    exact_chunks = exact.chunk_table()["num_unique"]
+    approx_chunks = approx.chunk_table()["num_unique"]
+    assert (abs(approx_chunks - exact_chunks) <= 0.05 * exact_chunks + 1).all()
+    assert abs(len(approx.chatters) / len(exact.chatters) - 1) <= 0.05
+
+
+def test_live_top(med_file):
+    '''
+    Checks the top clips can be asked for mid stream, and late messages are left out
+    '''
+    live_chat = live.liveChat(min_=1)
+    live_chat.update(med_file[:2000])
+    calc_result = live_chat.top('algo3_5', limit=5, scores=True)
+    assert len(calc_result) == 5
+    scores = [clip['score'] for clip in calc_result]
+    assert scores == sorted(scores, reverse=True)
+    everything = live_chat.top('algo3_5', limit=None, scores=True)
+    assert calc_result == everything[:5]
+
+    live_chat.update(med_file[:10])  # already seen, older than the newest message
+    assert live_chat.late > 0
+    assert live.liveChat().top('algo1') == []